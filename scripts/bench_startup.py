@@ -0,0 +1,110 @@
+"""
+Startup benchmark for the agent worker.
+
+Measures, each in a fresh interpreter:
+  - `import agent`            (what every job process and the test suite pay)
+  - `import agent` + prewarm  (job process boot, before it can take a call)
+
+Credentials are stripped from the environment, so this also checks that
+importing the agent doesn't need them.
+
+    uv run python scripts/bench_startup.py
+    uv run python scripts/bench_startup.py --runs 10 --importtime
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+IMPORT_ONLY = "import agent"
+JOB_BOOT = """
+import types
+import agent
+agent.prewarm(types.SimpleNamespace(userdata={}))
+"""
+
+CREDENTIAL_VARS = ("SUPABASE_URL", "SUPABASE_KEY", "OPENAI_API_KEY")
+
+
+def _env() -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in CREDENTIAL_VARS}
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [str(SRC_DIR), env.get("PYTHONPATH")])
+    )
+    return env
+
+
+def _time_run(code: str) -> float:
+    started = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SRC_DIR,
+        env=_env(),
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - started
+
+
+def bench(label: str, code: str, runs: int) -> None:
+    # First run warms the OS page cache / .pyc files and isn't counted
+    _time_run(code)
+    samples = [_time_run(code) for _ in range(runs)]
+
+    print(
+        f"{label:<24} min {min(samples) * 1000:7.0f}ms"
+        f"  median {statistics.median(samples) * 1000:7.0f}ms"
+        f"  max {max(samples) * 1000:7.0f}ms  ({runs} runs)"
+    )
+
+
+def import_profile(top: int) -> None:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_ONLY],
+        cwd=SRC_DIR,
+        env=_env(),
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        # Top-level modules only - nested ones are counted in their parent
+        if name.startswith("  ") and not name.startswith("    "):
+            rows.append((int(cumulative), name.strip()))
+
+    print("\nSlowest direct imports of agent (cumulative):")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000:7.0f}ms  {name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--importtime",
+        action="store_true",
+        help="also print the slowest imports from python -X importtime",
+    )
+    args = parser.parse_args()
+
+    bench("import agent", IMPORT_ONLY, args.runs)
+    bench("job process boot", JOB_BOOT, args.runs)
+
+    if args.importtime:
+        import_profile(top=10)
+
+
+if __name__ == "__main__":
+    main()
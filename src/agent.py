@@ -1,10 +1,12 @@
-from dataclasses import dataclass
 from datetime import datetime
 from functools import wraps
+from itertools import islice
+import asyncio
+import inspect
 import json
 import logging
+import os
 import time
-import uuid
 
 from typing import Annotated, Optional
 
@@ -14,22 +16,44 @@ from livekit.agents import (
     Agent,
     AgentServer,
     AgentSession,
+    AgentStateChangedEvent,
     ConversationItemAddedEvent,
     JobContext,
     JobProcess,
     MetricsCollectedEvent,
+    ModelSettings,
+    UserStateChangedEvent,
     cli,
     inference,
+    llm,
     metrics,
     room_io,
 )
 from livekit.plugins import noise_cancellation, silero, bey
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 from livekit.agents import function_tool, get_job_context, RunContext
-from model import db_book_appointment, db_cancel_appointment, db_get_all_appointments, db_get_appointments, save_call_summary
-from onnxruntime.capi.onnxruntime_inference_collection import Session
-from pydantic import BaseModel
-from summary import generate_call_summary
+from livekit.agents.telemetry import tracer
+from appointment_cache import appointment_cache
+from availability import slot_hold, slot_index
+from context_window import ContextWindow
+from events import close_event_publisher, get_event_publisher
+from filler import FillerClips
+from latency import LatencyBudget
+from logs import debug_enabled, log_debug, sample_debug_logging
+from model import DatabaseUnavailableError, db_book_appointment, db_cancel_appointment, db_confirm_hold, db_hold_slot, db_modify_appointment, db_pool_stats, db_release_holds, flush_writers, save_tool_event
+from prompt import INSTRUCTIONS, PROMPT_CACHE_KEY
+from slots import SlotSchedule, make_slot
+from state import create_session_state, get_session_state, remove_session_state
+from summary import SummaryJob, summary_queue
+from tool_metrics import (
+    PROMETHEUS_MULTIPROC_DIR,
+    PROMETHEUS_PORT,
+    observe_tool,
+    record_publish_time,
+    setup_tracing,
+    time_tool,
+)
+from tts_cache import clip_frames, phrase_cache, synthesize_cached
 
 
 logger = logging.getLogger("agent")
@@ -43,56 +67,33 @@ load_dotenv(".env.local")
 
 # RunContext_T = RunContext[CallData]
 
-session_state = {
-    # Todo - dig in to if/how this will be unique for each call 
-    # & best practice for where to include this - ctx.state?
-    # "session_id": str(uuid.uuid4()),
-    "user_identified": False,
-    "contact_number": None,
-    # Note - hardcoded for now
-    "appointment_slots": [
-        {
-            "slot_id": "slot_1",
-            "date": "2026-01-22",
-            "time": "10:00:00"
-        },
-        {
-            "slot_id": "slot_2",
-            "date": "2026-01-22",
-            "time": "14:00:00"
-        },
-        {
-            "slot_id": "slot_3",
-            "date": "2026-01-23",
-            "time": "11:00:00"
-        }
-    ],
-    "available_slots": None,
-    # Todo - convert to typed object
-    "user_appointments": None,
-    "transcripts": [],
-    "tool_calls": []
-}
-
-
-
-# class SessionState:
-#     def __init__(self):
-#         self.user_identified = False
-#         self.contact_number = None
-
-# SESSION_STATE = SessionState()
-
-# SESSION_STATE: dict[str, SessionState] = {}
-
-# def get_session(room_id: str) -> SessionState:
-#     if room_id not in SESSION_STATE:
-#         SESSION_STATE[room_id] = SessionState()
-#     return SESSION_STATE[room_id]
+# Clinic calendar that bookable slots are generated from (SLOT_* env vars)
+SLOT_SCHEDULE = SlotSchedule.from_env()
+# Max slots returned by a single fetch_slots call
+SLOT_OFFER_LIMIT = int(os.environ.get("SLOT_OFFER_LIMIT", "10"))
+# How long job shutdown waits for pending call summaries before leaving
+# them spooled (must stay under the worker's shutdown_process_timeout)
+SUMMARY_DRAIN_TIMEOUT = float(os.environ.get("SUMMARY_DRAIN_TIMEOUT", "8"))
+# "on" - always start the avatar, "off" - audio only,
+# "auto" - audio-only fast path for SIP (phone) callers
+AVATAR_MODE = os.environ.get("AVATAR_MODE", "on").lower()
+TTS_MODEL = "cartesia/sonic-3"
+TTS_VOICE = "9626c31c-bec5-4cca-baa8-f8ba9e84c8bc"
+# Cache key for this voice's phrase audio (see tts_cache.py)
+TTS_CACHE_VOICE = f"{TTS_MODEL}:{TTS_VOICE}"
+TTS_CACHE_ENABLED = os.environ.get("TTS_CACHE_ENABLED", "1") == "1"
+FILLER_ENABLED = os.environ.get("FILLER_ENABLED", "1") == "1"
+# Caller IDs are E.164; the national number callers say is its tail
+NATIONAL_NUMBER_DIGITS = 10
+# Silence before the VAD ends the user's speech (silero's default)
+VAD_MIN_SILENCE_SECONDS = 0.55
+# Transcript lines kept for the end-of-call summary and debug logs
+TRANSCRIPT_MAX_ITEMS = 200
 
 TOOL_REQUIREMENTS = {
     "identify_user": [],
     "fetch_slots": ["user_identified"],
+    "hold_slot": ["user_identified"],
     "book_appointment": ["user_identified"],
     "retrieve_appointments": ["user_identified"],
     "cancel_appointment": ["user_identified"],
@@ -100,7 +101,50 @@ TOOL_REQUIREMENTS = {
     "end_conversation": []
 }
 
-async def emit_tool_event(ctx, tool, phase, payload=None):
+# Seconds a tool may run before the caller hears a short filler phrase
+# (see filler.py). Tools that are always fast, or end the call, have none.
+TOOL_FILLER_DELAY = {
+    "fetch_slots": 0.4,
+    "retrieve_appointments": 0.4,
+    "book_appointment": 0.5,
+    "cancel_appointment": 0.5,
+    "modify_appointment": 0.5
+}
+
+# What each tool does to the call's state / the DB. The framework runs the
+# tool calls of one turn concurrently: reads overlap, writes run alone and
+# in the order the model issued them (so e.g. fetch_slots waits for an
+# identify_user issued before it). Unlisted tools count as writes.
+TOOL_ACCESS = {
+    "identify_user": "write",
+    "fetch_slots": "read",
+    "hold_slot": "write",
+    "book_appointment": "write",
+    "retrieve_appointments": "read",
+    "cancel_appointment": "write",
+    "modify_appointment": "write",
+    "end_conversation": "write"
+}
+
+SLOT_TAKEN = {
+    "error": "SLOT_ALREADY_BOOKED",
+    "message": "Another caller has just taken that slot. Offer the user a different one."
+}
+
+def slot_is_open(date: str, time: str, appointment_dt: datetime) -> bool:
+    """
+    The slot is on the schedule, in the bookable window, in the future and
+    not taken as far as this call knows - a slot this call holds is open
+    to it. Call slot_index.ensure_fresh() first.
+    """
+    return (
+        SLOT_SCHEDULE.is_valid_slot(date, time)
+        and slot_index.covers(date)
+        and appointment_dt > datetime.now()
+        and (not slot_index.is_booked(date, time) or slot_hold.holds(date, time))
+    )
+
+def emit_tool_event(ctx, tool, phase, payload=None):
     data = {
         "type": "tool_event",
         "tool": tool,
@@ -109,67 +153,180 @@ async def emit_tool_event(ctx, tool, phase, payload=None):
         "timestamp": int(time.time())
     }
 
-    session_state["tool_calls"].append(data)
-
-    await ctx.room.local_participant.publish_data(
-        json.dumps(data).encode("utf-8"),
-        # # NOTE - Figure out what this does
-        # kind=rtc.DataPacketKind.KIND_RELIABLE
+    get_session_state(ctx.job.id).tool_calls.append(data)
+    started = time.perf_counter()
+    save_tool_event(ctx.job.id, data)
+
+    # Queued for the room's background sender - tools never wait on the
+    # data channel
+    get_event_publisher(ctx).publish(data)
+    record_publish_time(time.perf_counter() - started)
+
+async def say_filler(session: AgentSession, phrase: str, clip, delay: float):
+    await asyncio.sleep(delay)
+    # Cached audio - no TTS call. Not added to the chat context, so the
+    # LLM doesn't repeat or answer it.
+    session.say(phrase, audio=clip_frames(clip), add_to_chat_ctx=False)
+
+
+def start_filler(ctx, state, run_context, tool_name: str, speech_id: str):
+    """
+    Schedules the tool's filler phrase to play if the tool is still running
+    after its TOOL_FILLER_DELAY. Cancel the returned task once the tool
+    returns; a filler that already started is short and plays out.
+    """
+    delay = TOOL_FILLER_DELAY.get(tool_name)
+    fillers = ctx.proc.userdata.get("fillers")
+    if not FILLER_ENABLED or delay is None or run_context is None or fillers is None:
+        return None
+
+    phrase = fillers.phrase_for(tool_name)
+    clip = fillers.get(phrase) if phrase else None
+    # One filler per turn, even when its tool calls run in parallel
+    if clip is None or state.filler_speech_id == speech_id:
+        return None
+
+    state.filler_speech_id = speech_id
+    return asyncio.create_task(
+        say_filler(run_context.session, phrase, clip, delay)
     )
 
+
 # TODO - Fix this - tool calls failing for identify_user (not seeing error also)
 def dispatch(tool_name: str):
     def decorator(tool_fn):
-        @wraps(tool_fn)
-        async def wrapper(*args, **kwargs):
-            print(args, kwargs)
-
-            ctx = get_job_context()
-            # if ctx is None:
-            #     return {
-            #         "error": "MISSING_CONTEXT",
-            #         "message": "LiveKit context not found."
-            #     }
+        signature = inspect.signature(tool_fn)
 
-            room_id = ctx.room.name
-            # session = get_session(room_id)
+        def tool_arguments(args, kwargs) -> dict:
+            # The framework passes every argument positionally - bind them
+            # to their names, minus self and the RunContext
+            bound = signature.bind_partial(*args, **kwargs).arguments
+            return {
+                name: value
+                for name, value in bound.items()
+                if name != "self" and not isinstance(value, RunContext)
+            }
 
-            print(f"Dispater called: room_id - {room_id}")
+        async def run(ctx, *args, **kwargs) -> dict:
+            state = get_session_state(ctx.job.id)
 
-            await emit_tool_event(ctx, tool_name, "start")
+            emit_tool_event(ctx, tool_name, "start")
 
             # Pre-condition check
             if "user_identified" in TOOL_REQUIREMENTS.get(tool_name, []):
-                if not session_state["user_identified"] or not session_state["contact_number"]:
+                if not state.user_identified or not state.contact_number:
                     output = {
                         "error": "USER_NOT_IDENTIFIED",
                         "message": "User must be identified before this action."
                     }
 
-                    await emit_tool_event(
+                    emit_tool_event(
                         ctx, tool_name, "error", output
                     )
 
                     logger.warning(
-                        "[TOOL BLOCKED] %s | output=%s",
+                        "[TOOL BLOCKED] %s",
                         tool_name,
-                        output
+                        extra={"tool": tool_name, "error": output["error"]}
                     )
 
                     return output
 
             # Call the actual tool
-            result = await tool_fn(*args, **kwargs)
-            logger.info(
-                "[TOOL RESULT] %s | output=%s",
-                tool_name,
-                json.dumps(result, default=str)
-            )
+            try:
+                result = await tool_fn(*args, **kwargs)
+            except DatabaseUnavailableError as e:
+                # Degrade to a retryable answer rather than freezing the turn
+                logger.warning(
+                    "[TOOL DB UNAVAILABLE] %s | %s",
+                    tool_name,
+                    e,
+                    extra={"tool": tool_name}
+                )
+                if TOOL_ACCESS.get(tool_name, "write") == "write":
+                    # The write may still commit after the deadline - don't
+                    # trust what this call cached about slots/appointments
+                    slot_index.invalidate()
+                    if state.contact_number:
+                        appointment_cache.invalidate(state.contact_number)
+
+                result = {
+                    "error": "SERVICE_UNAVAILABLE",
+                    "message": "The booking system is not responding right now. Ask the user to try again in a moment."
+                }
+            log_debug("[TOOL OUTPUT] %s", tool_name, tool=tool_name, output=result)
 
             if "error" in result:
-                await emit_tool_event(ctx, tool_name, "error", result)
+                emit_tool_event(ctx, tool_name, "error", result)
             else:
-                await emit_tool_event(ctx, tool_name, "success", result)
+                emit_tool_event(ctx, tool_name, "success", result)
+
+            return result
+
+        @wraps(tool_fn)
+        async def wrapper(*args, **kwargs):
+            ctx = get_job_context()
+            # if ctx is None:
+            #     return {
+            #         "error": "MISSING_CONTEXT",
+            #         "message": "LiveKit context not found."
+            #     }
+
+            # The turn this call belongs to - the framework's LLM/TTS metrics
+            # carry the same speech_id
+            run_context = next(
+                (arg for arg in args if isinstance(arg, RunContext)), None
+            )
+            speech_id = run_context.speech_handle.id if run_context else ""
+
+            if debug_enabled():
+                log_debug(
+                    "[TOOL CALL] %s",
+                    tool_name,
+                    tool=tool_name,
+                    room=ctx.room.name,
+                    arguments=tool_arguments(args, kwargs)
+                )
+
+            state = get_session_state(ctx.job.id)
+            filler = start_filler(ctx, state, run_context, tool_name, speech_id)
+
+            # Nested under the framework's function_tool span for this turn
+            with time_tool(tool_name) as timing, tracer.start_as_current_span(
+                f"tool.{tool_name}",
+                attributes={"tool": tool_name, "speech_id": speech_id}
+            ) as span:
+                try:
+                    async with state.tools.access(TOOL_ACCESS.get(tool_name, "write")):
+                        result = await run(ctx, *args, **kwargs)
+                finally:
+                    if filler is not None:
+                        filler.cancel()
+
+                outcome = result.get("error", "ok")
+                total = observe_tool(timing, outcome)
+                state.latency.add_tool_time(total)
+                span.set_attributes({
+                    "outcome": outcome,
+                    "db_ms": timing.db * 1000,
+                    "publish_ms": timing.publish * 1000
+                })
+
+            logger.info(
+                "[TOOL RESULT] %s | %s in %.0fms (db %.0fms)",
+                tool_name,
+                outcome,
+                total * 1000,
+                timing.db * 1000,
+                extra={
+                    "tool": tool_name,
+                    "error": result.get("error"),
+                    "speech_id": speech_id,
+                    "total_ms": total * 1000,
+                    "db_ms": timing.db * 1000,
+                    "publish_ms": timing.publish * 1000
+                }
+            )
 
             return result
 
@@ -182,98 +339,7 @@ def dispatch(tool_name: str):
 class Assistant(Agent):
     def __init__(self) -> None:
         super().__init__(
-            instructions="""You are an AI voice assistant for booking and managing appointments.
-You speak in a calm, friendly, professional tone suitable for phone calls.
-
-Your primary goal is to help users:
-- Book appointments
-- Retrieve existing appointments
-- Modify or cancel appointments
-- End the conversation politely
-
-You must follow the rules below strictly.
-
-────────────────────────
-GENERAL BEHAVIOR
-────────────────────────
-- Respond in clear, concise spoken English.
-- Keep responses short and natural for voice.
-- Do not use markdown, emojis, or lists in spoken responses.
-- Do not mention internal systems, tools, or databases.
-- Maintain conversation context across turns.
-- Handle one user request at a time.
-
-────────────────────────
-USER IDENTIFICATION
-────────────────────────
-- A user is uniquely identified by their phone number.
-- If the user has not been identified yet and requests any appointment action,
-  you MUST ask for their phone number first.
-- Do not proceed with booking, retrieving, modifying, or cancelling appointments
-  until the user is identified.
-
-────────────────────────
-TOOL CALLING RULES
-────────────────────────
-- You may call ONLY the tools provided to you.
-- If a tool call is required, respond ONLY with a valid JSON tool call.
-- Do NOT include any spoken text when making a tool call.
-- After a tool response, continue the conversation naturally.
-- Always call fetch_slots() at the start of the call
-
-────────────────────────
-AVAILABLE TOOLS
-────────────────────────
-1. identify_user(contact_number)
-2. fetch_slots()
-3. book_appointment(date, time)
-4. retrieve_appointments()
-5. cancel_appointment(appointment_id)
-6. modify_appointment(appointment_id, new_date, new_time)
-7. end_conversation()
-
-────────────────────────
-DATE AND TIME EXTRACTION
-────────────────────────
-- Always extract dates and times explicitly from user speech.
-- Convert all dates to ISO format: YYYY-MM-DD.
-- Convert all times to 24-hour format: HH:MM:SS.
-- If a date or time is ambiguous or missing, ask a clarifying question
-  instead of guessing.
-
-────────────────────────
-BOOKING RULES
-────────────────────────
-- Before booking, ensure the user is identified.
-- Fetch and share available slots for user to book. Do not ask or allow user to book random slots not available in the fetched list of slots.
-- If a requested slot is unavailable, inform the user politely and
-  ask them to choose another slot.
-- Always verbally confirm booking details after a successful booking.
-
-────────────────────────
-MODIFICATION AND CANCELLATION
-────────────────────────
-- Always retrieve users's current appointments and confirm which one they want to modify or cancel
-- If multiple appointments exist and the user does not specify which one,
-  ask a clarifying question.
-- Always confirm the final state after modification or cancellation.
-
-────────────────────────
-END OF CONVERSATION
-────────────────────────
-- When the user indicates they are done or says goodbye,
-  call the end_conversation tool.
-- End politely and professionally.
-
-────────────────────────
-ERROR HANDLING
-────────────────────────
-- If you are unsure what the user wants, ask a brief clarifying question.
-- Never hallucinate appointments, dates, or confirmations.
-- Never assume user intent without confirmation.
-
-You must always prioritize correctness, clarity, and a natural voice experience.
-""",
+            instructions=INSTRUCTIONS,
         )
         
         # TODO - Not getting picked up - figure out why (or not)
@@ -300,6 +366,22 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         #     }
         # ]
 
+    def tts_node(self, text, model_settings: ModelSettings):
+        if not TTS_CACHE_ENABLED:
+            return Agent.default.tts_node(self, text, model_settings)
+
+        # Sentences repeat within a call, and fixed greetings and goodbyes
+        # across calls - replay them from the phrase cache instead of
+        # calling the TTS
+        return synthesize_cached(
+            self.session.tts,
+            TTS_CACHE_VOICE,
+            text,
+            phrase_cache,
+            conn_options=self.session.conn_options.tts_conn_options,
+            on_cache_hit=get_session_state().latency.on_cached_tts
+        )
+
     # async def on_enter(self):
     #     # when the agent is added to the session, it'll generate a reply
     #     # according to its instructions
@@ -327,9 +409,31 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         # user = db.get_user_by_contact(normalized_number)
         # if not user:
         #     user = db.create_user(normalized_number)
-        # session = get_session(context.room.name)
-        session_state["user_identified"] = True
-        session_state["contact_number"] = contact_number
+        state = get_session_state()
+
+        # Stored and looked up digits only, like the caller ID prefetch
+        contact_number = digits_only(contact_number)
+        if contact_number is None:
+            return {
+                "error": "INVALID_CONTACT_NUMBER",
+                "message": "Ask the user to repeat their phone number."
+            }
+
+        state.user_identified = True
+        state.contact_number = contact_number
+
+        if is_caller_number(contact_number, state.caller_number):
+            # Prefetched by caller ID at call start - loaded or in flight.
+            # If it failed, retrieve_appointments loads them later.
+            try:
+                state.user_appointments = await appointment_cache.get(contact_number)
+            except DatabaseUnavailableError:
+                logger.warning("Caller ID prefetch failed", exc_info=True)
+        else:
+            # Nearly every call asks for its appointments next - start
+            # loading them now
+            appointment_cache.prefetch(contact_number)
+            state.user_appointments = appointment_cache.peek(contact_number)
 
         return {
             "status": "identified",
@@ -340,29 +444,112 @@ You must always prioritize correctness, clarity, and a natural voice experience.
     @dispatch("fetch_slots")
     async def fetch_slots(
         self, 
-        context: RunContext
+        context: RunContext,
+        preferred_date: Annotated[
+            Optional[str],
+            "Optional date in ISO format (YYYY-MM-DD) the user would like to start from. Omit to list the earliest slots."
+        ] = None
     ) -> dict:
         """
         Fetches available appointment slots that the user can choose from.
         """
-        all_appointments = db_get_all_appointments()
-        logger.info(f"All appointments: {json.dumps(all_appointments, indent=2)}")
-
-        # TODO - Not optimal
-        # Find entries in appointment_slots not present in all_appointments
-        session_state["available_slots"] = [
-            slot
-            for slot in session_state["appointment_slots"]
-            if not any(
-                slot["date"] == appt["date"] and slot["time"] == appt["time"]
-                for appt in all_appointments
-            )
+        state = get_session_state()
+
+        now = datetime.now()
+        start = now.date()
+        if preferred_date:
+            try:
+                start = max(start, datetime.fromisoformat(preferred_date).date())
+            except ValueError:
+                return {
+                    "error": "INVALID_DATE_TIME",
+                    "message": "Preferred date format is invalid."
+                }
+
+        # Served from the call's index, loaded at call start by
+        # prefetch_caller_data - usually ready by the first fetch_slots
+        await slot_index.ensure_fresh()
+        horizon_end = datetime.fromisoformat(slot_index.window()[1]).date()
+
+        # Candidates are generated lazily, so only the offered slots are
+        # ever materialized
+        state.available_slots = list(islice(
+            SLOT_SCHEDULE.iter_available(
+                start,
+                (horizon_end - start).days,
+                slot_index.booked_by_day,
+                not_before=now
+            ),
+            SLOT_OFFER_LIMIT
+        ))
+
+        log_debug("Available slots", slots=state.available_slots)
+
+        return {
+            "slots": state.available_slots
+        }
+
+    @function_tool
+    @dispatch("hold_slot")
+    async def hold_slot(
+        self,
+        context: RunContext,
+        date: Annotated[
+            str,
+            "Appointment date in ISO format (YYYY-MM-DD). Example: 2026-01-22"
+        ],
+        time: Annotated[
+            str,
+            "Appointment time in 24-hour format (HH:MM:SS). Example: 14:00:00"
         ]
+    ) -> dict:
+        """
+        Reserves a slot for a couple of minutes while the user confirms it,
+        so no other caller can book it in the meantime.
+        """
+        state = get_session_state()
+        session_id = state.session_id
 
-        logger.info(f"Available slots: {json.dumps(session_state["available_slots"], indent=2)}")
+        try:
+            appointment_dt = datetime.fromisoformat(f"{date}T{time}")
+        except ValueError:
+            return {
+                "error": "INVALID_DATE_TIME",
+                "message": "Date or time format is invalid."
+            }
+
+        await slot_index.ensure_fresh()
+
+        if not slot_is_open(date, time, appointment_dt):
+            return {
+                "error": "SLOT_NOT_AVAILABLE",
+                "message": "The requested slot does not exist."
+            }
+
+        # Also drops the hold on any slot this call considered before
+        result = await db_hold_slot(
+            session_id,
+            state.contact_number,
+            date,
+            time,
+            hold_seconds=int(slot_hold.ttl)
+        )
+
+        if "error" in result:
+            # Held or booked by another call - stop offering it
+            slot_index.mark_booked(date, time)
+            return SLOT_TAKEN
+
+        previous = slot_hold.lease
+        if previous is not None and (previous.date, previous.time) != (date, time):
+            slot_index.mark_free(previous.date, previous.time)
+        slot_hold.grant(date, time, hold_id=result["id"])
 
         return {
-            "slots": session_state["available_slots"]
+            "status": "HELD",
+            "date": date,
+            "time": time,
+            "hold_seconds": int(slot_hold.ttl)
         }
         
     @function_tool
@@ -383,11 +570,10 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         Books an appointment for the identified user.
         Prevents double-booking and validates slot availability.
         """
-        user_identified = session_state["user_identified"]
-        contact_number = session_state["contact_number"]
-        job_context = get_job_context()
-        session_id = job_context.job.id
-        logger.info(f"Session id read: {session_id}")
+        state = get_session_state()
+        user_identified = state.user_identified
+        contact_number = state.contact_number
+        session_id = get_job_context().job.id
 
         # ─────────────────────────────
         # 1. Hard guard: user identity
@@ -412,54 +598,51 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         # ─────────────────────────────
         # 3. Check slot exists
         # ─────────────────────────────
-        # Guardrail for edge cases when fetch_result tool call wasn't made
-        # if not available_slots:
-        #     self.fetch_slots()
-
-        slot_exists = any(
-            s["date"] == date and s["time"] == time
-            for s in session_state["available_slots"]
-        )
+        await slot_index.ensure_fresh()
 
-        if not slot_exists:
+        if not slot_is_open(date, time, appointment_dt):
             return {
                 "error": "SLOT_NOT_AVAILABLE",
                 "message": "The requested slot does not exist."
             }
 
         # ─────────────────────────────
-        # 4. Prevent double-booking
+        # 4. Create appointment
         # ─────────────────────────────
-        # Example DB check (pseudo-code)
-        #
-        # existing = db.find_appointment_by_datetime(date, time)
-        # if existing and existing.status == "booked":
-        #     return {
-        #         "error": "SLOT_ALREADY_BOOKED",
-        #         "message": "That slot is already booked."
-        #     }
+        # Confirm our own hold, or book straight away - one round trip
+        # either way, and the DB rejects the slot if another call has it
+        if slot_hold.holds(date, time):
+            result = await db_confirm_hold(slot_hold.lease.hold_id, session_id)
+        else:
+            result = await db_book_appointment(session_id, contact_number, date, time)
+        log_debug("Booked appointment", appointment=result)
 
-        # ─────────────────────────────
-        # 5. Create appointment
-        # ─────────────────────────────
-        # appointment_id = f"apt_{int(appointment_dt.timestamp())}"
+        # Either we now have the slot or another call beat us to it
+        slot_index.mark_booked(date, time)
 
-        result = db_book_appointment(session_id, contact_number, date, time)
-        logger.info(f"Booked appointment: {json.dumps(result, indent=2)}")
+        if "error" in result:
+            return SLOT_TAKEN
 
-        if session_state["user_appointments"]:
-            session_state["user_appointments"].append(result)
-        else:
-            session_state["user_appointments"] = db_get_appointments(contact_number)
-        
-        session_state["available_slots"] = [
-            slot
-            for slot in session_state["available_slots"]
-            if not(slot["date"] == date and slot["time"] == time)
-        ]
+        # Booking also released any hold this call had
+        slot_hold.release()
+
+        # Write-through - reading the list back is a cache hit (or the one
+        # load it would have cost anyway)
+        appointment_cache.upsert(contact_number, result)
+        state.user_appointments = await appointment_cache.get(contact_number)
 
-        logger.info(f"user_appointments after append: {json.dumps(session_state["user_appointments"], indent=2)}")
-        logger.info(f"available_slots after removal: {json.dumps(session_state["available_slots"], indent=2)}")
+        if state.available_slots is not None:
+            state.available_slots = [
+                slot
+                for slot in state.available_slots
+                if not(slot["date"] == date and slot["time"] == time)
+            ]
+
+        log_debug(
+            "Session after booking",
+            user_appointments=state.user_appointments,
+            available_slots=state.available_slots
+        )
         
 
         # Example DB insert (pseudo-code)
@@ -480,7 +663,7 @@ You must always prioritize correctness, clarity, and a natural voice experience.
             # "appointment_id": appointment_id,
             "date": date,
             "time": time,
-            "contact_number": session_state["contact_number"]
+            "contact_number": state.contact_number
         }
 
     @function_tool
@@ -489,9 +672,10 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         """
         Retrieves all appointments for the currently identified user.
         """
+        state = get_session_state()
 
         # Hard guard: user must be identified
-        if not session_state["user_identified"] or not session_state["contact_number"]:
+        if not state.user_identified or not state.contact_number:
             return {
                 "error": "USER_NOT_IDENTIFIED",
                 "message": "User must be identified before retrieving appointments."
@@ -503,12 +687,14 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         #     contact_number=session.contact_number
         # )
 
-        contact_number = session_state["contact_number"] 
-        session_state["user_appointments"] = db_get_appointments(contact_number)
-        logger.info(f"Retrieved appointments: {json.dumps(session_state['user_appointments'], indent=2)}")
+        # Loaded on identify and written through by book/cancel/modify, so
+        # repeat asks within the call don't go back to the DB
+        contact_number = state.contact_number 
+        state.user_appointments = await appointment_cache.get(contact_number)
+        log_debug("Retrieved appointments", appointments=state.user_appointments)
 
         return {
-            "appointments": session_state["user_appointments"]
+            "appointments": state.user_appointments
         }
 
     # @function_tool
@@ -534,16 +720,20 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         """
         Cancels an existing appointment for the identified user.
         """
+        state = get_session_state()
 
-        if not session_state["user_identified"] or not session_state["contact_number"]:
+        if not state.user_identified or not state.contact_number:
             return {
                 "error": "USER_NOT_IDENTIFIED",
                 "message": "User must be identified before cancelling an appointment."
             }
 
+        # Don't rely on retrieve_appointments having run first
+        state.user_appointments = await appointment_cache.get(state.contact_number)
+
         booking = [
             appointment
-            for appointment in session_state["user_appointments"]
+            for appointment in state.user_appointments
             if appointment["date"] == date and 
                 appointment["time"] == time and 
                 appointment["status"] == "BOOKED"
@@ -556,30 +746,35 @@ You must always prioritize correctness, clarity, and a natural voice experience.
             }
 
         appointment_id = booking[0]["id"]
-        result = db_cancel_appointment(appointment_id)
-        logger.info(f"Cancel appointment result: {result}")
+        result = await db_cancel_appointment(appointment_id)
+        log_debug("Cancel appointment result", result=result)
+
+        if "error" in result:
+            # Changed outside this call - re-read on next retrieval
+            appointment_cache.invalidate(state.contact_number)
+            return {
+                "error": "BOOKING_NOT_AVAILABLE",
+                "message": "The requested booking does not exist."
+            }
 
-        session_state["user_appointments"] = [
+        slot_index.mark_free(date, time)
+        appointment_cache.remove(state.contact_number, appointment_id)
+
+        state.user_appointments = [
             appointment
-            for appointment in session_state["user_appointments"]
+            for appointment in state.user_appointments
             if appointment["id"] != appointment_id
         ]
         
-        # Note - throws error on cancellation calls as value is not populated
-        # initially from the fetch_slots() call. 
-        # Hardcoding initial fetch_slots() call for now
-        removed_appointment_slot = [
-            slot
-            for slot in session_state["appointment_slots"]
-            if (slot["date"] == date and slot["time"] == time)
-        ]
-        
         # Ignore updating if fetch_slots isn't already called
-        if session_state["available_slots"] is None:
-            session_state["available_slots"].append(removed_appointment_slot[0])
+        if state.available_slots is not None and SLOT_SCHEDULE.is_valid_slot(date, time):
+            state.available_slots.append(make_slot(date, time))
 
-        logger.info(f"user_appointments after cancellation: {json.dumps(session_state["user_appointments"], indent=2)}")
-        logger.info(f"available_slots after cancellation: {json.dumps(session_state["available_slots"], indent=2)}")
+        log_debug(
+            "Session after cancellation",
+            user_appointments=state.user_appointments,
+            available_slots=state.available_slots
+        )
 
         # Example DB lookup (pseudo-code)
         #
@@ -624,8 +819,9 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         """
         Modifies the date and time of an existing appointment.
         """
+        state = get_session_state()
 
-        if not session_state["user_identified"] or not session_state["contact_number"]:
+        if not state.user_identified or not state.contact_number:
             return {
                 "error": "USER_NOT_IDENTIFIED",
                 "message": "User must be identified before modifying an appointment."
@@ -633,31 +829,27 @@ You must always prioritize correctness, clarity, and a natural voice experience.
 
         # Validate date/time
         try:
-            datetime.fromisoformat(f"{new_date}T{new_time}")
+            new_dt = datetime.fromisoformat(f"{new_date}T{new_time}")
         except ValueError:
             return {
                 "error": "INVALID_DATE_TIME",
                 "message": "New date or time format is invalid."
             }
 
-        # Example DB checks (pseudo-code)
-        #
-        # appt = db.get_appointment_by_id(appointment_id)
-        # if not appt:
-        #     return {"error": "APPOINTMENT_NOT_FOUND"}
-        #
-        # if db.is_slot_booked(new_date, new_time):
-        #     return {"error": "SLOT_ALREADY_BOOKED"}
-        #
-        # db.update_appointment_datetime(
-        #     appointment_id,
-        #     new_date,
-        #     new_time
-        # )
+        await slot_index.ensure_fresh()
+
+        if not slot_is_open(new_date, new_time, new_dt):
+            return {
+                "error": "SLOT_NOT_AVAILABLE",
+                "message": "The requested slot does not exist."
+            }
+
+        # Don't rely on retrieve_appointments having run first
+        state.user_appointments = await appointment_cache.get(state.contact_number)
 
         booking = [
             appointment
-            for appointment in session_state["user_appointments"]
+            for appointment in state.user_appointments
             if appointment["date"] == current_date and 
                 appointment["time"] == current_time and 
                 appointment["status"] == "BOOKED"
@@ -670,35 +862,58 @@ You must always prioritize correctness, clarity, and a natural voice experience.
             }
 
         appointment_id = booking[0]["id"]
-        cancel_result = db_cancel_appointment(appointment_id)
-        logger.info(f"Cancel appointment result: {cancel_result}")
 
-        book_result = db_book_appointment(session_state["contact_number"], new_date, new_time)
-        logger.info(f"Booked appointment: {json.dumps(book_result, indent=2)}")
+        # One atomic move - the user is never left without an appointment,
+        # and on a conflict nothing changes
+        result = await db_modify_appointment(
+            appointment_id,
+            state.session_id,
+            state.contact_number,
+            new_date,
+            new_time
+        )
+        log_debug("Modify appointment result", result=result)
 
+        if result.get("error") == "SLOT_ALREADY_BOOKED":
+            slot_index.mark_booked(new_date, new_time)
+            return SLOT_TAKEN
 
-        session_state["user_appointments"] = [
-                appointment
-                for appointment in session_state["user_appointments"]
-                if appointment["id"] != appointment_id
-            ]
-        session_state["user_appointments"].append(book_result)
+        if "error" in result:
+            # Changed outside this call - re-read on next retrieval
+            appointment_cache.invalidate(state.contact_number)
+            return {
+                "error": "BOOKING_NOT_AVAILABLE",
+                "message": "The requested booking does not exist."
+            }
 
-        removed_appointment_slot = [
-            slot
-            for slot in session_state["appointment_slots"]
-            if (slot["date"] == current_date and slot["time"] == current_time)
+        slot_index.mark_free(current_date, current_time)
+        appointment_cache.upsert(state.contact_number, result)
+        slot_index.mark_booked(new_date, new_time)
+        # The move also consumed any hold this call had
+        slot_hold.release()
+
+        # Updated in place, in the cache or else in the session - no re-read
+        cached = appointment_cache.peek(state.contact_number)
+        state.user_appointments = cached if cached is not None else [
+            result if appointment["id"] == appointment_id else appointment
+            for appointment in state.user_appointments
         ]
-        session_state["available_slots"].append(removed_appointment_slot[0])
 
-        session_state["available_slots"] = [
-            slot
-            for slot in session_state["available_slots"]
-            if not(slot["date"] == new_date and slot["time"] == new_time)
-        ]
+        if state.available_slots is not None:
+            if SLOT_SCHEDULE.is_valid_slot(current_date, current_time):
+                state.available_slots.append(make_slot(current_date, current_time))
+
+            state.available_slots = [
+                slot
+                for slot in state.available_slots
+                if not(slot["date"] == new_date and slot["time"] == new_time)
+            ]
 
-        logger.info(f"user_appointments after cancellation: {json.dumps(session_state["user_appointments"], indent=2)}")
-        logger.info(f"available_slots after cancellation: {json.dumps(session_state["available_slots"], indent=2)}")
+        log_debug(
+            "Session after modification",
+            user_appointments=state.user_appointments,
+            available_slots=state.available_slots
+        )
 
         return {
             "status": "MODIFIED",
@@ -718,26 +933,26 @@ You must always prioritize correctness, clarity, and a natural voice experience.
         """
         job_context = get_job_context()
         session_id = job_context.job.id
+        state = get_session_state(session_id)
+
+        async def publish_summary(summary: str):
+            # Best effort - the caller has usually left by the time it's ready
+            if not job_context.room.isconnected():
+                return
+
+            await job_context.room.local_participant.publish_data(
+                json.dumps({
+                    "type": "call_summary",
+                    "summary": summary
+                }).encode("utf-8"),
+                # kind=rtc.DataPacketKind.KIND_RELIABLE
+            )
 
-        summary = await generate_call_summary(session_state)
-        logger.info(f"Call summary: {summary}")
-        
-
-        # save to DB
-        result = save_call_summary(
-            session_id=session_id,
-            contact_number=session_state["contact_number"],
-            summary=summary
-        )
-
-        logger.info(f"Summary saved to DB: {result}")
-
-        await job_context.room.local_participant.publish_data(
-            json.dumps({
-                "type": "call_summary",
-                "summary": summary
-            }).encode("utf-8"),
-            # kind=rtc.DataPacketKind.KIND_RELIABLE
+        # Summarize + save in the background so hangup doesn't wait on the
+        # LLM and the DB
+        summary_queue.enqueue(
+            SummaryJob.from_state(state),
+            on_summary=publish_summary
         )
 
         # await context.session.say("Thank you for calling. Have a great day!")
@@ -770,11 +985,114 @@ You must always prioritize correctness, clarity, and a natural voice experience.
     #     return "sunny with a temperature of 70 degrees."
 
 
-server = AgentServer()
+server = AgentServer(
+    prometheus_port=int(PROMETHEUS_PORT) if PROMETHEUS_PORT else None,
+    prometheus_multiproc_dir=PROMETHEUS_MULTIPROC_DIR if PROMETHEUS_PORT else None,
+)
 
 
 def prewarm(proc: JobProcess):
-    proc.userdata["vad"] = silero.VAD.load()
+    started = time.perf_counter()
+    setup_tracing()
+    proc.userdata["vad"] = silero.VAD.load(
+        min_silence_duration=VAD_MIN_SILENCE_SECONDS
+    )
+
+    # Noise cancellation options are plain config objects - resolve the
+    # model paths once per process instead of per participant
+    proc.userdata["noise_cancellation"] = {
+        "sip": noise_cancellation.BVCTelephony(),
+        "default": noise_cancellation.BVC(),
+    }
+
+    # Phrase audio synthesized by earlier processes on this machine
+    phrase_cache.load()
+    fillers = FillerClips(voice=TTS_CACHE_VOICE)
+    fillers.load()
+    proc.userdata["fillers"] = fillers
+
+    # Build the agent (instructions + tool schemas) before the call arrives.
+    # A job process runs a single job, so my_agent takes it exactly once.
+    proc.userdata["assistant"] = Assistant()
+
+    # Note - the turn detector model itself lives in the worker's shared
+    # inference process and is loaded once per worker, not per job. The
+    # per-job MultilingualModel needs the job's inference executor, so it's
+    # created in my_agent and warmed up there (see warm_turn_detector).
+
+    logger.info("Prewarm done in %.0fms", (time.perf_counter() - started) * 1000)
+
+
+def has_sip_participant(room: rtc.Room) -> bool:
+    return any(
+        participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
+        for participant in room.remote_participants.values()
+    )
+
+
+def digits_only(number: Optional[str]) -> Optional[str]:
+    digits = "".join(ch for ch in number or "" if ch.isdigit())
+    return digits or None
+
+
+def caller_number_keys(caller_number: str) -> set[str]:
+    """
+    Contact numbers the caller ID may be stored under: callers usually
+    say their national number, which is the caller ID's last 10 digits
+    without the country code.
+    """
+    return {caller_number, caller_number[-NATIONAL_NUMBER_DIGITS:]}
+
+
+def is_caller_number(contact_number: str, caller_number: Optional[str]) -> bool:
+    return caller_number is not None and contact_number in caller_number_keys(caller_number)
+
+
+async def prefetch_caller_data(ctx: JobContext, state, connected: asyncio.Task):
+    """
+    Warms what the first tool calls need while the greeting plays: the slot
+    index for fetch_slots and, for phone callers, their appointments by
+    caller ID.
+    """
+    slot_index.prefetch()
+
+    try:
+        await connected
+        participant = await ctx.wait_for_participant()
+    except Exception:
+        logger.debug("Caller prefetch skipped", exc_info=True)
+        return
+
+    if participant.kind != rtc.ParticipantKind.PARTICIPANT_KIND_SIP:
+        return
+
+    # Contact numbers are stored digits only (see identify_user)
+    state.caller_number = digits_only(participant.attributes.get("sip.phoneNumber"))
+    if state.caller_number:
+        logger.info("Prefetching appointments for SIP caller")
+        for contact_number in caller_number_keys(state.caller_number):
+            appointment_cache.prefetch(contact_number)
+
+
+async def warm_turn_detector(turn_detection: MultilingualModel):
+    """
+    Runs one throwaway end-of-turn prediction so the first real one
+    doesn't pay the cold inference path.
+    """
+    chat_ctx = llm.ChatContext.empty()
+    chat_ctx.add_message(role="user", content="Hello")
+
+    started = time.perf_counter()
+    try:
+        await turn_detection.predict_end_of_turn(chat_ctx)
+    except Exception:
+        logger.warning("Turn detector warm-up failed", exc_info=True)
+        return
+
+    logger.info(
+        "Turn detector warmed up in %.0fms",
+        (time.perf_counter() - started) * 1000
+    )
 
 
 server.setup_fnc = prewarm
@@ -788,7 +1106,38 @@ async def my_agent(ctx: JobContext):
         "room": ctx.room.name,
     }
 
-    logger.info(f"Session ID: {ctx.job.id}")
+    logger.info("Session ID: %s", ctx.job.id)
+    if sample_debug_logging():
+        logger.info("Call sampled for debug logging")
+    job_started = time.perf_counter()
+    # Startup phase timings (ms), logged once the session is ready
+    startup: dict[str, float] = {}
+
+    async def timed(phase: str, aw):
+        started = time.perf_counter()
+        try:
+            return await aw
+        finally:
+            startup[f"{phase}_ms"] = (time.perf_counter() - started) * 1000
+
+    # Join the room right away - it only needs the job's token, so the
+    # handshake overlaps with building the session and starting the avatar.
+    # session.start() connects too; ctx.connect() is idempotent.
+    connect_task = asyncio.create_task(timed("connect", ctx.connect()))
+
+    # Per-call state, released when the job shuts down
+    state = create_session_state(ctx.job.id)
+    state.latency = LatencyBudget(speech_end_lag=VAD_MIN_SILENCE_SECONDS)
+
+    # Pick up summaries orphaned by job processes that exited early
+    summary_queue.replay_spool()
+
+    state.keep_task(asyncio.create_task(
+        prefetch_caller_data(ctx, state, connect_task)
+    ))
+
+    turn_detection = MultilingualModel()
+    state.keep_task(asyncio.create_task(warm_turn_detector(turn_detection)))
 
     # Set up a voice AI pipeline using OpenAI, Cartesia, AssemblyAI, and the LiveKit turn detector
     session = AgentSession(
@@ -798,21 +1147,29 @@ async def my_agent(ctx: JobContext):
         stt=inference.STT(model="deepgram/flux-general", language="en"),
         # A Large Language Model (LLM) is your agent's brain, processing user input and generating a response
         # See all available models at https://docs.livekit.io/agents/models/llm/
-        llm=inference.LLM(model="openai/gpt-4.1-mini"),
+        llm=inference.LLM(
+            model="openai/gpt-4.1-mini",
+            extra_kwargs={"prompt_cache_key": PROMPT_CACHE_KEY}
+        ),
         # Text-to-speech (TTS) is your agent's voice, turning the LLM's text into speech that the user can hear
         # See all available models as well as voice selections at https://docs.livekit.io/agents/models/tts/
         tts=inference.TTS(
-            model="cartesia/sonic-3", voice="9626c31c-bec5-4cca-baa8-f8ba9e84c8bc"
+            model=TTS_MODEL, voice=TTS_VOICE
         ),
         # VAD and turn detection are used to determine when the user is speaking and when the agent should respond
         # See more at https://docs.livekit.io/agents/build/turns
-        turn_detection=MultilingualModel(),
+        turn_detection=turn_detection,
         vad=ctx.proc.userdata["vad"],
         # allow the LLM to generate a response while waiting for the end of turn
         # See more at https://docs.livekit.io/agents/build/audio/#preemptive-generation
         preemptive_generation=True
     )
 
+    # Synthesize any filler clips this machine doesn't have yet, off the
+    # call path; until then slow tools just run without a filler
+    if FILLER_ENABLED:
+        ctx.proc.userdata["fillers"].warm(session.tts)
+
     # To use a realtime model instead of a voice pipeline, use the following session setup instead.
     # (Note: This is for the OpenAI Realtime API. For other providers, see https://docs.livekit.io/agents/models/realtime/))
     # 1. Install livekit-agents[openai]
@@ -825,11 +1182,28 @@ async def my_agent(ctx: JobContext):
 
     # # Add a virtual avatar to the session, if desired
     # # For other providers, see https://docs.livekit.io/agents/models/avatar/
-    avatar = bey.AvatarSession(
-      avatar_id="1c7a7291-ee28-4800-8f34-acfbfc2d07c0",  # See https://docs.livekit.io/agents/models/avatar/plugins/hedra
-    )
-    # # Start the avatar and wait for it to join
-    await avatar.start(session, room=ctx.room)
+    avatar_task = None
+    use_avatar = AVATAR_MODE == "on"
+    if AVATAR_MODE == "auto":
+        # Phone callers can't see the avatar. Inbound SIP participants are in
+        # the room when the job is dispatched, so connecting tells us.
+        await connect_task
+        use_avatar = not has_sip_participant(ctx.room)
+
+    if use_avatar:
+        avatar = bey.AvatarSession(
+          avatar_id="1c7a7291-ee28-4800-8f34-acfbfc2d07c0",  # See https://docs.livekit.io/agents/models/avatar/plugins/hedra
+        )
+        # Start the avatar concurrently with the room connection; it only
+        # has to be up before session.start() so audio is routed through it
+        avatar_task = asyncio.create_task(
+            timed("avatar", avatar.start(session, room=ctx.room))
+        )
+
+    assistant = ctx.proc.userdata.pop("assistant", None) or Assistant()
+    # Folds older turns into a running summary so the per-turn LLM request
+    # stays bounded however long the call runs
+    context_window = ContextWindow(assistant)
 
     # log metrics as they are emitted, and total usage after session is over
     usage_collector = metrics.UsageCollector()
@@ -838,45 +1212,128 @@ async def my_agent(ctx: JobContext):
     def _on_metrics_collected(ev: MetricsCollectedEvent):
         metrics.log_metrics(ev.metrics)
         usage_collector.collect(ev.metrics)
+        state.latency.on_metrics(ev.metrics)
 
     async def log_usage():
         summary = usage_collector.get_summary()
-        logger.info(f"Usage: {summary}")
+        logger.info("Usage: %s", summary)
+        logger.info("DB pool: %s", db_pool_stats())
+        logger.info("Appointment cache: %s", appointment_cache.stats())
+        logger.info("TTS phrase cache: %s", phrase_cache.stats())
+        logger.info("Chat context: %s", context_window.stats())
+
+        # Per-call p50/p95/p99 by stage (ms); the worker-wide aggregate is
+        # agent_turn_latency_seconds on the Prometheus endpoint
+        latency = state.latency.summary()
+        logger.info(
+            "Turn latency (ms): %s",
+            " | ".join(
+                f"{stage} p50={s['p50']} p95={s['p95']} p99={s['p99']} (n={s['count']})"
+                for stage, s in latency.items()
+                if s["count"]
+            ) or "no turns",
+            extra={"latency": latency}
+        )
+
+        log_debug(
+            "Session transcripts and tool calls",
+            transcripts=state.transcripts,
+            tool_calls=state.tool_calls
+        )
+
+    async def flush_summaries():
+        await summary_queue.drain(timeout=SUMMARY_DRAIN_TIMEOUT)
+        # Buffered summaries / tool events still waiting for their batch
+        await flush_writers()
 
-        # # Log session_state transcripts and tool_calls values for debugging
-        # logger.info(f"Session transcripts: {json.dumps(session_state['transcripts'], indent=2, default=str)}")
+    async def release_session_state():
+        # A hold the caller never confirmed frees up now rather than on expiry
+        if slot_hold.release() is not None:
+            try:
+                await db_release_holds(ctx.job.id)
+            except Exception:
+                logger.warning("Releasing slot holds failed", exc_info=True)
 
-        # logger.info(f"Session tool_calls: {json.dumps(session_state['tool_calls'], indent=2, default=str)}")
+        remove_session_state(ctx.job.id)
+        await close_event_publisher(ctx.job.id)
+        await context_window.aclose()
 
     # shutdown callbacks are triggered when the session is over
     ctx.add_shutdown_callback(log_usage)
+    ctx.add_shutdown_callback(flush_summaries)
+    ctx.add_shutdown_callback(release_session_state)
+
+    @session.on("agent_state_changed")
+    def _on_agent_state_changed(ev: AgentStateChangedEvent):
+        state.latency.on_agent_state(ev)
+
+        # Cold-start metric: job start -> first agent audio out
+        if ev.new_state == "speaking" and "first_audio_ms" not in startup:
+            startup["first_audio_ms"] = (time.perf_counter() - job_started) * 1000
+            logger.info(
+                "Time to first agent audio: %.0fms",
+                startup["first_audio_ms"],
+                extra={"first_audio_ms": startup["first_audio_ms"]}
+            )
+
+    @session.on("user_state_changed")
+    def _on_user_state_changed(ev: UserStateChangedEvent):
+        state.latency.on_user_state(ev)
 
     @session.on("conversation_item_added")
     def on_conversation_item_added(event: ConversationItemAddedEvent):
-        logger.info(f"Conversation item added from {event.item.role}: {event.item.text_content}. interrupted: {event.item.interrupted}")
+        logger.info(
+            "Conversation item added from %s (interrupted: %s)",
+            event.item.role,
+            event.item.interrupted
+        )
+        log_debug(
+            "Conversation item",
+            role=event.item.role,
+            text=event.item.text_content
+        )
         # to iterate over all types of content:
         for content in event.item.content:
             if isinstance(content, str):
-                session_state["transcripts"].append({
+                state.transcripts.append({
                     "role": event.item.role,
                     "content": content
                 })
+        del state.transcripts[:-TRANSCRIPT_MAX_ITEMS]
+
+        context_window.on_item_added()
     
+    noise_filters = ctx.proc.userdata.get("noise_cancellation") or {
+        "sip": noise_cancellation.BVCTelephony(),
+        "default": noise_cancellation.BVC(),
+    }
+
+    if avatar_task is not None:
+        await avatar_task
+
     # Start the session, which initializes the voice pipeline and warms up the models
-    await session.start(
-        agent=Assistant(),
+    await timed("session_start", session.start(
+        agent=assistant,
         room=ctx.room,
         room_options=room_io.RoomOptions(
             audio_input=room_io.AudioInputOptions(
-                noise_cancellation=lambda params: noise_cancellation.BVCTelephony()
+                noise_cancellation=lambda params: noise_filters["sip"]
                 if params.participant.kind == rtc.ParticipantKind.PARTICIPANT_KIND_SIP
-                else noise_cancellation.BVC(),
+                else noise_filters["default"],
             ),
         ),
-    )
+    ))
 
     # Join the room and connect to the user
-    await ctx.connect()
+    await connect_task
+    startup["ready_ms"] = (time.perf_counter() - job_started) * 1000
+    logger.info(
+        "Session ready in %.0fms (avatar: %s) | phases: %s",
+        startup["ready_ms"],
+        "on" if use_avatar else "off",
+        {phase: round(ms) for phase, ms in startup.items()},
+        extra={"startup": startup}
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from model import db_get_upcoming_appointments
+
+logger = logging.getLogger("agent")
+
+# Appointments can also change outside this worker (other workers, the
+# dashboard), so cached lists are re-read after this long
+APPOINTMENT_CACHE_TTL_SECONDS = float(os.environ.get("APPOINTMENT_CACHE_TTL_SECONDS", "60"))
+# Callers kept, least recently used evicted first
+APPOINTMENT_CACHE_MAX_CONTACTS = int(os.environ.get("APPOINTMENT_CACHE_MAX_CONTACTS", "1024"))
+
+# What tools and the LLM see of an appointment row
+APPOINTMENT_FIELDS = ("id", "date", "time", "status")
+
+
+def _slim(row: dict) -> dict:
+    return {key: row.get(key) for key in APPOINTMENT_FIELDS}
+
+
+class AppointmentCache:
+    """
+    LRU + TTL cache of callers' upcoming appointments, keyed by contact
+    number.
+
+    A job process handles a single call, so this lives for one call and
+    can't serve repeat callers: what it saves is the repeat reads within
+    a call. The list is loaded once (prefetched on identify) and the
+    book/cancel/modify paths write through, so it's read from the DB at
+    most once per TTL. Concurrent misses for one contact share a single
+    load, and a load that raced with a local write isn't cached (it may
+    predate the write).
+    """
+
+    def __init__(
+        self,
+        loader,
+        ttl: float = APPOINTMENT_CACHE_TTL_SECONDS,
+        max_contacts: int = APPOINTMENT_CACHE_MAX_CONTACTS
+    ):
+        self._loader = loader
+        self._ttl = ttl
+        self._max_contacts = max_contacts
+        # contact_number -> (loaded_at, appointments sorted by date/time)
+        self._entries: OrderedDict[str, tuple[float, list[dict]]] = OrderedDict()
+        self._loads: dict[str, asyncio.Task] = {}
+        # Local writes while a load is in flight, to spot loads that raced
+        # with one
+        self._writes: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def peek(self, contact_number: str) -> Optional[list[dict]]:
+        """
+        Cached appointments if fresh, without touching the DB.
+        """
+        entry = self._entries.get(contact_number)
+        if entry is None or time.monotonic() - entry[0] > self._ttl:
+            return None
+
+        self._entries.move_to_end(contact_number)
+        return list(entry[1])
+
+    async def get(self, contact_number: str) -> list[dict]:
+        appointments = self.peek(contact_number)
+        if appointments is not None:
+            self.hits += 1
+            return appointments
+
+        self.misses += 1
+        return list(await asyncio.shield(self._start_load(contact_number)))
+
+    def prefetch(self, contact_number: str) -> None:
+        """
+        Starts loading a caller's list in the background unless it's
+        cached or already loading.
+        """
+        if self.peek(contact_number) is None:
+            self._start_load(contact_number)
+
+    def upsert(self, contact_number: str, appointment: dict) -> None:
+        self._update(
+            contact_number,
+            lambda appointments: [
+                a for a in appointments if a["id"] != appointment["id"]
+            ] + [_slim(appointment)]
+        )
+
+    def remove(self, contact_number: str, appointment_id) -> None:
+        self._update(
+            contact_number,
+            lambda appointments: [
+                a for a in appointments if a["id"] != appointment_id
+            ]
+        )
+
+    def invalidate(self, contact_number: Optional[str] = None) -> None:
+        """
+        Drops one caller's list (or all) - e.g. when the DB disagrees with
+        what we cached.
+        """
+        if contact_number is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(contact_number, None)
+            self._bump(contact_number)
+
+    def stats(self) -> dict:
+        return {
+            "contacts": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _start_load(self, contact_number: str) -> asyncio.Task:
+        load = self._loads.get(contact_number)
+        if load is None:
+            load = asyncio.create_task(self._load(contact_number))
+            self._loads[contact_number] = load
+            load.add_done_callback(lambda task: self._load_done(contact_number, task))
+        return load
+
+    async def _load(self, contact_number: str) -> list[dict]:
+        writes = self._writes.get(contact_number, 0)
+        rows = await self._loader(contact_number)
+        appointments = [_slim(row) for row in rows]
+
+        if self._writes.get(contact_number, 0) == writes:
+            self._store(contact_number, appointments)
+
+        return appointments
+
+    def _update(self, contact_number: str, change) -> None:
+        self._bump(contact_number)
+
+        entry = self._entries.get(contact_number)
+        if entry is None:
+            # Not cached - the next get() reads the DB, which has the write
+            return
+
+        appointments = sorted(
+            change(entry[1]),
+            key=lambda a: (a["date"], a["time"])
+        )
+        # Keeps its TTL - a write doesn't make the rest of the list fresher
+        self._entries[contact_number] = (entry[0], appointments)
+
+    def _store(self, contact_number: str, appointments: list[dict]) -> None:
+        self._entries[contact_number] = (time.monotonic(), appointments)
+        self._entries.move_to_end(contact_number)
+        while len(self._entries) > self._max_contacts:
+            self._entries.popitem(last=False)
+
+    def _bump(self, contact_number: str) -> None:
+        # Only loads in flight need the counter
+        if contact_number in self._loads:
+            self._writes[contact_number] = self._writes.get(contact_number, 0) + 1
+
+    def _load_done(self, contact_number: str, task: asyncio.Task) -> None:
+        self._loads.pop(contact_number, None)
+        self._writes.pop(contact_number, None)
+
+        # Prefetches have no one awaiting them to see the error
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(
+                "Loading appointments failed",
+                exc_info=task.exception()
+            )
+
+
+# One per job process, i.e. per call
+appointment_cache = AppointmentCache(loader=db_get_upcoming_appointments)
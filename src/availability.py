@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+from model import db_get_taken_slots_between
+
+logger = logging.getLogger("agent")
+
+# How long a loaded snapshot is served before a background refresh kicks in
+AVAILABILITY_TTL_SECONDS = float(os.environ.get("AVAILABILITY_TTL_SECONDS", "30"))
+# How far ahead slots are offered (and bookings loaded)
+AVAILABILITY_HORIZON_DAYS = int(os.environ.get("AVAILABILITY_HORIZON_DAYS", "30"))
+# How long a slot the caller is considering stays reserved for them
+SLOT_HOLD_SECONDS = int(os.environ.get("SLOT_HOLD_SECONDS", "120"))
+
+
+class SlotAvailabilityIndex:
+    """
+    Per-process index of taken slots - booked, or held by a call - as ISO
+    date -> set of times.
+
+    A job process handles a single call, so this lives for one call: the
+    load is started at call start (see prefetch_caller_data) and afterwards
+    lookups are O(1) hash lookups. Stale snapshots keep serving while a
+    refresh runs in the background, and bookings made in this call are
+    pushed in directly so they never wait for the next refresh.
+    """
+
+    def __init__(
+        self,
+        loader,
+        ttl: float = AVAILABILITY_TTL_SECONDS,
+        horizon_days: int = AVAILABILITY_HORIZON_DAYS
+    ):
+        self._loader = loader
+        self._ttl = ttl
+        self._horizon_days = horizon_days
+        self._booked: dict[str, set[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        # Local writes, replayed on top of a snapshot that was in flight
+        # while they happened: (date, time) -> (booked, monotonic ts)
+        self._local_writes: dict[tuple[str, str], tuple[bool, float]] = {}
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def window(self) -> tuple[str, str]:
+        """
+        ISO (start, end) dates of the bookable range, today included.
+        """
+        start = date.today()
+        end = start + timedelta(days=self._horizon_days)
+        return start.isoformat(), end.isoformat()
+
+    def covers(self, day: str) -> bool:
+        start, end = self.window()
+        return start <= day <= end
+
+    def is_stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self._ttl
+        )
+
+    async def ensure_fresh(self) -> None:
+        """
+        Blocks only for the very first load; stale data triggers a
+        background refresh instead.
+        """
+        if not self.is_loaded:
+            # Concurrent cold lookups share one in-flight load
+            await asyncio.shield(self._schedule_refresh())
+        elif self.is_stale():
+            self._schedule_refresh()
+
+    def prefetch(self) -> None:
+        """
+        Starts a refresh in the background if the index is cold or stale.
+        """
+        if self.is_stale():
+            self._schedule_refresh()
+
+    async def refresh(self) -> None:
+        async with self._lock:
+            started = time.monotonic()
+            rows = await self._loader(*self.window())
+
+            booked: dict[str, set[str]] = {}
+            for row in rows:
+                booked.setdefault(row["date"], set()).add(row["time"])
+            for key, (is_booked, ts) in self._local_writes.items():
+                if ts >= started:
+                    self._set(booked, key, is_booked)
+
+            self._booked = booked
+            self._local_writes = {
+                key: write
+                for key, write in self._local_writes.items()
+                if write[1] >= started
+            }
+            self._loaded_at = time.monotonic()
+
+            logger.debug(
+                "Availability index refreshed: %d booked slots in %.0fms",
+                len(rows),
+                (self._loaded_at - started) * 1000
+            )
+
+    def invalidate(self) -> None:
+        """
+        Forces the next ensure_fresh() to refresh in the background.
+        """
+        if self._loaded_at is not None:
+            self._loaded_at = float("-inf")
+
+    def is_booked(self, date: str, time: str) -> bool:
+        return time in self._booked.get(date, ())
+
+    @property
+    def booked_by_day(self) -> dict[str, set[str]]:
+        """
+        Read-only view for the slot engine: ISO date -> booked times.
+        """
+        return self._booked
+
+    def mark_booked(self, date: str, time: str) -> None:
+        self._write((date, time), True)
+
+    def mark_free(self, date: str, time: str) -> None:
+        self._write((date, time), False)
+
+    def _write(self, key: tuple[str, str], is_booked: bool) -> None:
+        self._set(self._booked, key, is_booked)
+        self._local_writes[key] = (is_booked, time.monotonic())
+
+    @staticmethod
+    def _set(booked: dict, key: tuple[str, str], is_booked: bool) -> None:
+        day, slot_time = key
+        if is_booked:
+            booked.setdefault(day, set()).add(slot_time)
+        elif day in booked:
+            booked[day].discard(slot_time)
+
+    def _schedule_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self.refresh())
+            self._refresh_task.add_done_callback(self._on_refresh_done)
+
+        return self._refresh_task
+
+    @staticmethod
+    def _on_refresh_done(task: asyncio.Task) -> None:
+        # Keep serving the old snapshot; the next stale lookup retries
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                "Availability index refresh failed",
+                exc_info=task.exception()
+            )
+
+
+@dataclass
+class SlotLease:
+    date: str
+    time: str
+    # Id of the HELD appointments row backing this lease
+    hold_id: str
+    expires_at: float
+
+
+class CallSlotHold:
+    """
+    This call's slot hold, mirroring its HELD row in the DB. A call holds
+    at most one slot - taking a new one replaces the previous, as
+    reserve_slot() does in the DB. An expired lease is dropped on lookup.
+
+    Other calls' holds come in with slot_index's HELD rows; the DB catches
+    any taken since the last refresh.
+    """
+
+    def __init__(self, ttl: float = SLOT_HOLD_SECONDS):
+        self.ttl = ttl
+        self._lease: Optional[SlotLease] = None
+
+    @property
+    def lease(self) -> Optional[SlotLease]:
+        if self._lease is not None and self._lease.expires_at <= time.monotonic():
+            self._lease = None
+        return self._lease
+
+    def holds(self, date: str, slot_time: str) -> bool:
+        lease = self.lease
+        return lease is not None and (lease.date, lease.time) == (date, slot_time)
+
+    def grant(self, date: str, slot_time: str, hold_id: str) -> SlotLease:
+        self._lease = SlotLease(
+            date=date,
+            time=slot_time,
+            hold_id=hold_id,
+            expires_at=time.monotonic() + self.ttl
+        )
+        return self._lease
+
+    def release(self) -> Optional[SlotLease]:
+        lease, self._lease = self._lease, None
+        return lease
+
+
+# One per job process, i.e. per call
+slot_index = SlotAvailabilityIndex(loader=db_get_taken_slots_between)
+slot_hold = CallSlotHold()
@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from livekit.agents import Agent, llm
+
+from logs import log_debug
+from summary import get_openai_client
+
+logger = logging.getLogger("agent")
+
+# User turns (with their replies and tool calls) kept verbatim in the LLM
+# context; everything older lives in the running summary
+CONTEXT_KEEP_TURNS = int(os.environ.get("CONTEXT_KEEP_TURNS", "6"))
+# Older turns are folded in batches of this many. Between folds the prompt
+# prefix (instructions + summary) stays the same, so it stays cacheable.
+CONTEXT_FOLD_TURNS = int(os.environ.get("CONTEXT_FOLD_TURNS", "4"))
+# Tool results are cut to this many characters when summarized
+CONTEXT_MAX_TOOL_OUTPUT = 600
+
+SUMMARY_ITEM_ID = "context_summary"
+
+FOLD_INSTRUCTIONS = """- Merge the earlier summary and the new conversation excerpt into one summary.
+- Keep facts later turns may need: the caller's identity, appointment ids,
+  dates and times offered, held, booked, modified or cancelled, and open requests.
+- Drop small talk and tool details that no longer matter.
+- At most 8 short bullet points. Do NOT invent information."""
+
+
+def _render(item: llm.ChatItem) -> Optional[str]:
+    if item.type == "message":
+        text = item.text_content
+        return f"{item.role}: {text}" if text else None
+    if item.type == "function_call":
+        return f"tool call: {item.name}({item.arguments})"
+    if item.type == "function_call_output":
+        return f"tool result ({item.name}): {item.output[:CONTEXT_MAX_TOOL_OUTPUT]}"
+    return None
+
+
+async def fold_into_summary(summary: str, items: list[llm.ChatItem]) -> str:
+    """
+    Returns `summary` updated with the given chat items.
+    """
+    excerpt = "\n".join(line for line in map(_render, items) if line)
+
+    prompt = f"""
+You maintain a running summary of a phone call with an appointment booking assistant.
+
+Earlier summary:
+{summary or "(none)"}
+
+New conversation excerpt:
+{excerpt}
+
+Instructions:
+{FOLD_INSTRUCTIONS}
+"""
+
+    response = await get_openai_client().responses.create(
+        model="gpt-4.1-mini",
+        input=prompt,
+        max_output_tokens=300
+    )
+
+    return response.output_text.strip()
+
+
+class ContextWindow:
+    """
+    Keeps an agent's chat context bounded for the whole call.
+
+    The last `keep_turns` user turns stay verbatim. Once `fold_turns` more
+    have piled up behind them, a background task folds those older turns
+    (messages, tool calls and their results) into a running summary, which
+    replaces them as one system message right after the instructions.
+    The LLM request size is then bounded by the instructions, the summary
+    and at most keep_turns + fold_turns turns.
+    """
+
+    def __init__(
+        self,
+        agent: Agent,
+        keep_turns: int = CONTEXT_KEEP_TURNS,
+        fold_turns: int = CONTEXT_FOLD_TURNS,
+        summarize=fold_into_summary
+    ):
+        self._agent = agent
+        self._keep_turns = keep_turns
+        self._fold_turns = fold_turns
+        self._summarize = summarize
+        self._summary = ""
+        self._task: Optional[asyncio.Task] = None
+        self.folds = 0
+        self.folded_items = 0
+
+    def on_item_added(self) -> None:
+        """
+        Call on every conversation_item_added; cheap when there's nothing
+        to fold. One fold runs at a time.
+        """
+        if self._task is not None and not self._task.done():
+            return
+
+        old = self._foldable()
+        if sum(_is_user_turn(item) for item in old) >= self._fold_turns:
+            self._task = asyncio.create_task(self._fold(old))
+
+    def stats(self) -> dict:
+        return {
+            "folds": self.folds,
+            "folded_items": self.folded_items,
+            "summary_chars": len(self._summary),
+            "items": len(self._agent.chat_ctx.items)
+        }
+
+    async def aclose(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def _foldable(self) -> list[llm.ChatItem]:
+        items = [item for item in self._agent.chat_ctx.items if not _is_pinned(item)]
+        turn_starts = [i for i, item in enumerate(items) if _is_user_turn(item)]
+        if len(turn_starts) <= self._keep_turns:
+            return []
+
+        # Cut at a user message, so a turn's tool calls and results are
+        # never split between the summary and the verbatim window
+        return items[:turn_starts[-self._keep_turns]]
+
+    async def _fold(self, old: list[llm.ChatItem]) -> None:
+        try:
+            summary = await self._summarize(self._summary, old)
+        except Exception:
+            # Context just stays longer until the next attempt
+            logger.warning("Folding chat context into summary failed", exc_info=True)
+            return
+
+        # Built from the live context after the await, so turns added
+        # while summarizing are kept
+        folded = {item.id for item in old}
+        chat_ctx = self._agent.chat_ctx.copy()
+        items = [
+            item for item in chat_ctx.items
+            if item.id not in folded and item.id != SUMMARY_ITEM_ID
+        ]
+        at = next(
+            (i for i, item in enumerate(items) if not _is_system(item)),
+            len(items)
+        )
+        items.insert(at, llm.ChatMessage(
+            id=SUMMARY_ITEM_ID,
+            role="system",
+            content=[f"Summary of the call so far:\n{summary}"],
+            created_at=old[-1].created_at
+        ))
+        chat_ctx.items = items
+        await self._agent.update_chat_ctx(chat_ctx)
+
+        self._summary = summary
+        self.folds += 1
+        self.folded_items += len(old)
+        log_debug("Folded chat context", items=len(old), summary=summary)
+
+
+def _is_system(item: llm.ChatItem) -> bool:
+    return item.type == "message" and item.role in ("system", "developer")
+
+
+def _is_pinned(item: llm.ChatItem) -> bool:
+    # Instructions and the summary itself are never folded
+    return _is_system(item) or item.id == SUMMARY_ITEM_ID
+
+
+def _is_user_turn(item: llm.ChatItem) -> bool:
+    return item.type == "message" and item.role == "user"
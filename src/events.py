@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Optional
+
+from livekit import rtc
+from livekit.agents import JobContext
+
+from tool_metrics import ROOM_EVENT_SEND
+
+logger = logging.getLogger("agent")
+
+# Events published within this window go out in one data packet
+EVENT_FLUSH_INTERVAL = float(os.environ.get("EVENT_FLUSH_INTERVAL", "0.05"))
+# Events waiting to be sent per room; past this the oldest are dropped
+EVENT_MAX_QUEUE = int(os.environ.get("EVENT_MAX_QUEUE", "256"))
+# Stay under the ~15KiB limit LiveKit puts on a reliable data packet
+EVENT_MAX_PACKET_BYTES = int(os.environ.get("EVENT_MAX_PACKET_BYTES", "14000"))
+# A send taking longer than this counts as a stalled client
+EVENT_PUBLISH_TIMEOUT = float(os.environ.get("EVENT_PUBLISH_TIMEOUT", "2"))
+# Longest pause between sends while the client keeps stalling
+EVENT_MAX_BACKOFF = 2.0
+# Participant attribute a client sets to "1" to accept event_batch packets
+EVENT_BATCH_ATTRIBUTE = "events.batch"
+
+
+class RoomEventPublisher:
+    """
+    Sends UI events (tool progress etc.) to a room over the data channel
+    without making the caller wait.
+
+    publish() only queues the event. A background task sends whatever has
+    queued up every flush_interval seconds. Every event goes out as its
+    own packet, as before, unless all clients in the room have opted in
+    by setting the EVENT_BATCH_ATTRIBUTE participant attribute to "1";
+    then several events share one packet:
+
+        {"type": "event_batch", "events": [<event>, <event>, ...]}
+
+    with the events in publish order, each exactly as it would have been
+    sent alone. A lone event is always sent as-is.
+
+    While a send is slow, new events pile up and go out together in the
+    next packet. Failed or timed-out sends back off exponentially, and
+    once max_queue events are waiting the oldest are dropped - tool
+    "start" events first, since their outcome event supersedes them.
+    """
+
+    def __init__(
+        self,
+        room: rtc.Room,
+        flush_interval: float = EVENT_FLUSH_INTERVAL,
+        max_queue: int = EVENT_MAX_QUEUE,
+        max_packet_bytes: int = EVENT_MAX_PACKET_BYTES,
+        publish_timeout: float = EVENT_PUBLISH_TIMEOUT
+    ):
+        self._room = room
+        self._flush_interval = flush_interval
+        self._max_queue = max_queue
+        self._max_packet_bytes = max_packet_bytes
+        self._publish_timeout = publish_timeout
+        # Encoded events, oldest first: (event, json bytes)
+        self._queue: deque[tuple[dict, bytes]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+        self._closed = False
+        self.sent = 0
+        self.dropped = 0
+
+    def publish(self, event: dict) -> None:
+        if self._closed:
+            return
+
+        if len(self._queue) >= self._max_queue:
+            self._drop_one()
+
+        self._queue.append((event, json.dumps(event, default=str).encode("utf-8")))
+        self._wakeup.set()
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "pending": len(self._queue)
+        }
+
+    async def aclose(self) -> None:
+        """
+        Stops the sender. Called on job shutdown, after the room has
+        disconnected, so anything still queued is discarded.
+        """
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        if self._queue or self.dropped:
+            logger.info("Room events at shutdown: %s", self.stats())
+        self._queue.clear()
+
+    def _drop_one(self) -> None:
+        for i, (event, _) in enumerate(self._queue):
+            if event.get("phase") == "start":
+                del self._queue[i]
+                break
+        else:
+            self._queue.popleft()
+
+        self.dropped += 1
+        # First drop and then every 100th, so a dead client can't flood logs
+        if self.dropped % 100 == 1:
+            logger.warning(
+                "Room event queue full (%d) - dropped %d events so far",
+                self._max_queue,
+                self.dropped
+            )
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            # Let events published in quick succession (a tool's start and
+            # result) share one packet
+            await asyncio.sleep(self._flush_interval)
+
+            while self._queue and self._room.isconnected():
+                count, packet = self._next_packet()
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(
+                        self._room.local_participant.publish_data(packet),
+                        self._publish_timeout
+                    )
+                    ROOM_EVENT_SEND.observe(time.perf_counter() - started)
+                except Exception as e:
+                    # The packet is lost; later events are still worth sending
+                    self._failures += 1
+                    logger.warning(
+                        "Publishing %d room events failed (%d in a row): %r",
+                        count,
+                        self._failures,
+                        e
+                    )
+                    await asyncio.sleep(min(
+                        self._flush_interval * 2 ** self._failures,
+                        EVENT_MAX_BACKOFF
+                    ))
+                    continue
+
+                self._failures = 0
+                self.sent += count
+
+    def _clients_accept_batches(self) -> bool:
+        participants = self._room.remote_participants.values()
+        return bool(participants) and all(
+            p.attributes.get(EVENT_BATCH_ATTRIBUTE) == "1" for p in participants
+        )
+
+    def _next_packet(self) -> tuple[int, bytes]:
+        parts = [self._queue.popleft()[1]]
+        size = len(parts[0])
+        if not self._clients_accept_batches():
+            return 1, parts[0]
+
+        # +1 per event for the separating comma, +40 for the envelope
+        while self._queue:
+            data = self._queue[0][1]
+            if size + len(data) + 41 > self._max_packet_bytes:
+                break
+            self._queue.popleft()
+            parts.append(data)
+            size += len(data) + 1
+
+        if len(parts) == 1:
+            return 1, parts[0]
+
+        return len(parts), b'{"type": "event_batch", "events": [' + b",".join(parts) + b"]}"
+
+
+# One publisher per live call, keyed by job id
+_publishers: dict[str, RoomEventPublisher] = {}
+
+
+def get_event_publisher(ctx: JobContext) -> RoomEventPublisher:
+    publisher = _publishers.get(ctx.job.id)
+    if publisher is None:
+        publisher = RoomEventPublisher(ctx.room)
+        _publishers[ctx.job.id] = publisher
+    return publisher
+
+
+async def close_event_publisher(session_id: str) -> None:
+    publisher = _publishers.pop(session_id, None)
+    if publisher is not None:
+        await publisher.aclose()
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Optional
+
+from livekit import rtc
+from livekit.agents import tts as agents_tts
+
+from tts_cache import PhraseCache, phrase_cache
+
+logger = logging.getLogger("agent")
+
+# Said while a slow tool is still running. Keep them short and neutral -
+# the real answer follows right after.
+FILLER_PHRASES = {
+    "fetch_slots": "Let me check what's available.",
+    "retrieve_appointments": "Let me pull up your appointments.",
+    "book_appointment": "Okay, booking that now.",
+    "cancel_appointment": "One moment please.",
+    "modify_appointment": "Sure, let me move that for you.",
+}
+
+
+class FillerClips:
+    """
+    Pre-synthesized filler audio, per phrase, for one TTS voice.
+
+    Clips live in the phrase cache (see tts_cache.py), so each phrase costs
+    one TTS call per machine. load() picks up clips already cached (done in
+    prewarm, so no TTS call); warm() synthesizes the missing ones once in
+    the background. Until a clip exists, get() returns None and the caller
+    simply skips the filler.
+    """
+
+    def __init__(
+        self,
+        voice: str,
+        phrases: dict[str, str] = FILLER_PHRASES,
+        cache: PhraseCache = phrase_cache
+    ):
+        self._voice = voice
+        self._phrases = phrases
+        self._cache = cache
+        # Held here too, so the cache's LRU can't evict them
+        self._clips: dict[str, rtc.AudioFrame] = {}
+        self._warming: Optional[asyncio.Task] = None
+
+    def load(self) -> int:
+        for phrase in set(self._phrases.values()) - self._clips.keys():
+            clip = self._cache.get(self._voice, phrase)
+            if clip is not None:
+                self._clips[phrase] = clip
+
+        return len(self._clips)
+
+    def warm(self, tts: agents_tts.TTS) -> None:
+        if self._warming is None and len(self._clips) < len(set(self._phrases.values())):
+            self._warming = asyncio.create_task(self._synthesize_missing(tts))
+
+    def phrase_for(self, tool: str) -> Optional[str]:
+        return self._phrases.get(tool)
+
+    def get(self, phrase: str) -> Optional[rtc.AudioFrame]:
+        return self._clips.get(phrase)
+
+    async def _synthesize_missing(self, tts: agents_tts.TTS) -> None:
+        for phrase in set(self._phrases.values()) - self._clips.keys():
+            try:
+                frames = [ev.frame async for ev in tts.synthesize(phrase)]
+            except Exception:
+                logger.warning("Synthesizing filler %r failed", phrase, exc_info=True)
+                continue
+
+            clip = rtc.combine_audio_frames(frames)
+            self._clips[phrase] = clip
+            self._cache.put(self._voice, phrase, clip, persist=True)
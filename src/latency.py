@@ -0,0 +1,125 @@
+import logging
+import math
+import os
+from collections import deque
+from typing import Optional
+
+import prometheus_client
+from livekit.agents import AgentStateChangedEvent, UserStateChangedEvent
+from livekit.agents.metrics import EOUMetrics, LLMMetrics, TTSMetrics
+
+logger = logging.getLogger("agent")
+
+# Samples kept per stage for the per-call rolling percentiles
+LATENCY_WINDOW = int(os.environ.get("LATENCY_WINDOW", "256"))
+# eou_delay: user stopped speaking -> end of turn detected
+# llm_ttft / tts_ttfb: time to first token / first audio byte
+# tool: time spent in one tool call
+# e2e: user stopped speaking -> agent starts speaking, measured directly.
+# The other stages are a breakdown, not its parts: with preemptive
+# generation the LLM request overlaps the end-of-turn delay.
+STAGES = ("eou_delay", "llm_ttft", "tool", "tts_ttfb", "e2e")
+
+# Worker-wide aggregate across calls, served on the Prometheus endpoint
+TURN_LATENCY = prometheus_client.Histogram(
+    "agent_turn_latency_seconds",
+    "Voice turn latency by stage",
+    ["stage"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10),
+)
+
+
+class RollingPercentiles:
+    """
+    Percentiles over the last `size` samples. The window is a fixed ring
+    buffer, so memory stays constant however long the call runs; it is
+    only sorted when a summary is asked for.
+    """
+
+    def __init__(self, size: int = LATENCY_WINDOW):
+        self._samples: deque[float] = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        self._samples.append(value)
+        self.count += 1
+
+    def summary(self) -> dict:
+        """
+        Nearest-rank p50/p95/p99 and max, in milliseconds.
+        """
+        ordered = sorted(self._samples)
+        if not ordered:
+            return {"count": 0}
+
+        def rank(q: float) -> float:
+            return ordered[max(math.ceil(q * len(ordered)) - 1, 0)] * 1000
+
+        return {
+            "count": self.count,
+            "p50": round(rank(0.50)),
+            "p95": round(rank(0.95)),
+            "p99": round(rank(0.99)),
+            "max": round(ordered[-1] * 1000)
+        }
+
+
+class LatencyBudget:
+    """
+    Per-call turn latency profile, built online from the session's
+    metrics_collected stream, its user/agent state changes and tool
+    timings from dispatch.
+
+    e2e runs from the user's stopped-speaking event to the agent's next
+    speaking state, so the greeting and other agent-initiated speech
+    don't count. The VAD only reports the end of speech once its silence
+    window has passed; `speech_end_lag` (that window) is taken off so e2e
+    starts when the user actually went quiet.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW, speech_end_lag: float = 0.0):
+        self._stages = {stage: RollingPercentiles(window) for stage in STAGES}
+        self._speech_end_lag = speech_end_lag
+        # Wall-clock time the user last stopped speaking, until answered
+        self._user_stopped_at: Optional[float] = None
+
+    def on_metrics(self, metrics) -> None:
+        if isinstance(metrics, EOUMetrics):
+            self._record("eou_delay", metrics.end_of_utterance_delay)
+        elif isinstance(metrics, LLMMetrics):
+            self._record("llm_ttft", metrics.ttft)
+        elif isinstance(metrics, TTSMetrics):
+            self._record("tts_ttfb", metrics.ttfb)
+
+    def on_user_state(self, ev: UserStateChangedEvent) -> None:
+        if ev.old_state == "speaking" and ev.new_state == "listening":
+            self._user_stopped_at = ev.created_at - self._speech_end_lag
+        elif ev.new_state == "speaking":
+            # Still talking - e2e starts when they stop again
+            self._user_stopped_at = None
+
+    def on_agent_state(self, ev: AgentStateChangedEvent) -> None:
+        if ev.new_state == "speaking" and self._user_stopped_at is not None:
+            self._record("e2e", ev.created_at - self._user_stopped_at)
+            self._user_stopped_at = None
+
+    def on_cached_tts(self, ttfb: float) -> None:
+        """
+        A sentence played from the phrase cache - no TTS request, so no
+        TTSMetrics to count its (near zero) time to first audio.
+        """
+        self._record("tts_ttfb", ttfb)
+
+    def add_tool_time(self, seconds: float) -> None:
+        self._record("tool", seconds)
+
+    def summary(self) -> dict:
+        return {stage: self._stages[stage].summary() for stage in STAGES}
+
+    def _record(self, stage: str, seconds: float) -> None:
+        # Negative values mean the stage didn't happen (e.g. no audio)
+        if seconds < 0:
+            return
+
+        self._stages[stage].add(seconds)
+        TURN_LATENCY.labels(stage).observe(seconds)
@@ -0,0 +1,41 @@
+import logging
+import os
+import random
+from contextvars import ContextVar
+
+logger = logging.getLogger("agent")
+
+# Fraction of calls that log full payloads (slot lists, appointment tables,
+# tool arguments and results) at INFO, e.g. 0.01 for one call in a hundred
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0"))
+
+# Whether the current call is in the debug sample. Set in the job's
+# entrypoint, so every task the session spawns inherits it
+_debug_sampled: ContextVar[bool] = ContextVar("debug_sampled", default=False)
+
+
+def sample_debug_logging() -> bool:
+    """
+    Decides, once per call, whether it logs full payloads.
+    """
+    sampled = random.random() < LOG_DEBUG_SAMPLE_RATE
+    _debug_sampled.set(sampled)
+    return sampled
+
+
+def debug_enabled() -> bool:
+    return _debug_sampled.get() or logger.isEnabledFor(logging.DEBUG)
+
+
+def log_debug(msg: str, *args, **fields) -> None:
+    """
+    Logs a verbose payload for sampled calls (at INFO, so it survives the
+    production log level) or when DEBUG is on, and is a no-op otherwise.
+
+    Pass raw objects as fields - they go out as log record extras and are
+    only serialized by the handler if the record is emitted.
+    """
+    if _debug_sampled.get():
+        logger.info(msg, *args, extra=fields)
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, extra=fields)
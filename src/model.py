@@ -1,82 +1,422 @@
-from typing_extensions import deprecated
-from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import cache
+from typing import TYPE_CHECKING, Optional
+import asyncio
+import httpx
 import os
+import threading
+import time
+import uuid
 from dotenv import load_dotenv
+from livekit.agents.telemetry import tracer
 import logging
 
+from tool_metrics import record_db_time
+
+if TYPE_CHECKING:
+    from supabase import Client
+
 load_dotenv(".env.local")
 
 # Silence HTTP/2 HPACK debug logs
 logging.getLogger("hpack.hpack").setLevel(logging.WARNING)
 
+logger = logging.getLogger("agent")
+
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
 SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Upper bound on concurrent PostgREST requests per process
+DB_MAX_WORKERS = int(os.environ.get("DB_MAX_WORKERS", "8"))
+# Persistent connections kept open to PostgREST (one per DB worker is enough)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", str(DB_MAX_WORKERS)))
+DB_KEEPALIVE_SECONDS = float(os.environ.get("DB_KEEPALIVE_SECONDS", "60"))
+DB_HTTP2 = os.environ.get("DB_HTTP2", "1") == "1"
+DB_CONNECT_TIMEOUT = float(os.environ.get("DB_CONNECT_TIMEOUT", "1.5"))
+# Default deadline for one DB operation, queueing included. A tool call
+# sits inside a voice turn, so past this the caller is better served by
+# a "try again" than by more silence.
+DB_TIMEOUT = float(os.environ.get("DB_TIMEOUT", "2.5"))
+# Rows per request for range-scoped reads
+DB_PAGE_SIZE = int(os.environ.get("DB_PAGE_SIZE", "500"))
+# Buffered writes are flushed at this many rows or after this many seconds
+WRITE_BATCH_ROWS = int(os.environ.get("WRITE_BATCH_ROWS", "50"))
+WRITE_BATCH_DELAY = float(os.environ.get("WRITE_BATCH_DELAY", "1"))
+# Rows kept for retry while the DB is failing; oldest are dropped beyond this
+WRITE_BUFFER_MAX_ROWS = int(os.environ.get("WRITE_BUFFER_MAX_ROWS", "5000"))
+
+# Schema: the indexes, tables and functions used below (reserve_slot(),
+# reschedule_appointment(), ...) are in supabase/migrations. Apply them
+# before deploying an agent that depends on them.
+#
+# Writes can commit after _execute's deadline has given up on them, so
+# every write below is safe to retry: batched inserts are upserts on a
+# client-side key, and reserve_slot() / confirm return the caller's own
+# row if an earlier attempt already went through.
+
+# Postgres unique_violation - another active row (booked or held) has the slot
+UNIQUE_VIOLATION = "23505"
+# PostgREST: no such function - its migration hasn't been applied
+MISSING_FUNCTION = "PGRST202"
+
+
+class DatabaseUnavailableError(Exception):
+    """
+    The DB didn't answer within the operation's deadline or couldn't be
+    reached. Tools report it to the caller instead of hanging.
+    """
+
+
+def create_supabase_client(
+    url: Optional[str] = SUPABASE_URL,
+    key: Optional[str] = SUPABASE_KEY
+) -> "Client":
+    """
+    Supabase client on a pooled, keep-alive (HTTP/2 by default) transport
+    with bounded connect/read timeouts.
+    """
+    # Imported here - the supabase package alone is most of this module's
+    # import time, and workers that never hit the DB shouldn't pay for it
+    from supabase import ClientOptions, create_client
+
+    http_client = httpx.Client(
+        http2=DB_HTTP2,
+        limits=httpx.Limits(
+            max_connections=DB_POOL_SIZE,
+            max_keepalive_connections=DB_POOL_SIZE,
+            keepalive_expiry=DB_KEEPALIVE_SECONDS
+        ),
+        timeout=httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT),
+        follow_redirects=True
+    )
+
+    return create_client(
+        url,
+        key,
+        options=ClientOptions(httpx_client=http_client)
+    )
+
+
+@cache
+def get_supabase() -> "Client":
+    """
+    Process-wide client, created on first use so importing this module
+    needs neither credentials nor the supabase package.
+    """
+    return create_supabase_client()
+
+# The supabase client is synchronous - every execute() is a blocking HTTP
+# round trip. Run them on a bounded pool so tools never stall the event loop
+# (audio, VAD and turn detection share it).
+_db_executor = ThreadPoolExecutor(
+    max_workers=DB_MAX_WORKERS,
+    thread_name_prefix="db"
+)
+
+_pool_lock = threading.Lock()
+_pool_stats = {
+    "active": 0,
+    "peak_active": 0,
+    # Requests that found every DB worker busy and had to queue
+    "saturated": 0,
+    "timeouts": 0,
+    "unreachable": 0
+}
+
+
+def db_pool_stats() -> dict:
+    """
+    Snapshot of DB pool usage for this process.
+    """
+    with _pool_lock:
+        stats = dict(_pool_stats)
+
+    stats["max_workers"] = DB_MAX_WORKERS
+    stats["waiting"] = _db_executor._work_queue.qsize()
+    return stats
+
+
+def _run_query(query):
+    with _pool_lock:
+        _pool_stats["active"] += 1
+        _pool_stats["peak_active"] = max(
+            _pool_stats["peak_active"], _pool_stats["active"]
+        )
+
+    try:
+        return query.execute()
+    finally:
+        with _pool_lock:
+            _pool_stats["active"] -= 1
+
+
+async def _execute(query, timeout: float = DB_TIMEOUT):
+    """
+    Runs a built PostgREST query on the DB executor and awaits the response.
+    Raises DatabaseUnavailableError past `timeout` seconds or on transport
+    failures.
+    """
+    with _pool_lock:
+        if _pool_stats["active"] >= DB_MAX_WORKERS:
+            _pool_stats["saturated"] += 1
+
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        with tracer.start_as_current_span("db_query"):
+            return await asyncio.wait_for(
+                loop.run_in_executor(_db_executor, _run_query, query),
+                timeout
+            )
+    except asyncio.TimeoutError as e:
+        with _pool_lock:
+            _pool_stats["timeouts"] += 1
+        raise DatabaseUnavailableError(
+            f"DB operation exceeded its {timeout}s deadline"
+        ) from e
+    except httpx.TransportError as e:
+        with _pool_lock:
+            _pool_stats["unreachable"] += 1
+        raise DatabaseUnavailableError(str(e)) from e
+    finally:
+        # Counted against the tool call awaiting it, if any
+        record_db_time(time.perf_counter() - started)
 
-def db_book_appointment(
+def _raise_if_not_deployed(e: Exception, function: str) -> None:
+    """
+    A missing DB function means the migrations weren't applied - report
+    it like an outage, so the tool answers "try again" instead of failing.
+    """
+    if getattr(e, "code", None) == MISSING_FUNCTION:
+        logger.error("%s() is missing - apply supabase/migrations", function)
+        raise DatabaseUnavailableError(f"{function}() is not deployed") from e
+
+async def db_reserve_slot(
     session_id: str,
     contact_number: str,
     date: str,
-    time: str
+    time: str,
+    status: str = "BOOKED",
+    hold_seconds: Optional[int] = None
 ):
+    """
+    Books (status="BOOKED") or holds (status="HELD") a slot in one round
+    trip via the reserve_slot() DB function. Returns the row, or
+    {"error": "SLOT_ALREADY_BOOKED"} if another call has it. Safe to retry:
+    a slot this call already booked comes back as its booking.
+    """
     try:
-        result = (
-            supabase
-            .table("appointments")
-            .insert({
-                "session_id": session_id,
-                "contact_number": contact_number,
-                "date": date,
-                "time": time,
-                "status": "BOOKED"
+        result = await _execute(
+            get_supabase().rpc("reserve_slot", {
+                "p_session_id": session_id,
+                "p_contact_number": contact_number,
+                "p_date": date,
+                "p_time": time,
+                "p_status": status,
+                "p_hold_seconds": hold_seconds
             })
-            .execute()
         )
-
-        return result.data[0]
-
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        # Unique constraint violation → slot already booked
-        if "unique_active_slot" in str(e):
+        if getattr(e, "code", None) == UNIQUE_VIOLATION:
             return {"error": "SLOT_ALREADY_BOOKED"}
+        _raise_if_not_deployed(e, "reserve_slot")
         raise
 
-# Todo - deprecate after making available slots dynamic
-def db_get_all_appointments():
-    result = (
-        supabase
+    # A function returning a row comes back as a single object
+    return result.data[0] if isinstance(result.data, list) else result.data
+
+async def db_book_appointment(
+    session_id: str,
+    contact_number: str,
+    date: str,
+    time: str
+):
+    return await db_reserve_slot(session_id, contact_number, date, time)
+
+async def db_hold_slot(
+    session_id: str,
+    contact_number: str,
+    date: str,
+    time: str,
+    hold_seconds: int
+):
+    return await db_reserve_slot(
+        session_id,
+        contact_number,
+        date,
+        time,
+        status="HELD",
+        hold_seconds=hold_seconds
+    )
+
+async def db_confirm_hold(hold_id: str, session_id: str):
+    """
+    Turns this call's hold into a booking. Fails if the hold expired and
+    another call took the slot over in the meantime.
+    """
+    result = await _execute(
+        get_supabase()
         .table("appointments")
-        .select("id, date, time, status")
+        .update({ "status": "BOOKED", "held_until": None })
+        .eq("id", hold_id)
+        .eq("session_id", session_id)
+        .eq("status", "HELD")
+    )
+
+    if result.data:
+        return result.data[0]
+
+    # A retry whose earlier attempt committed after timing out
+    booked = await _execute(
+        get_supabase()
+        .table("appointments")
+        .select("*")
+        .eq("id", hold_id)
+        .eq("session_id", session_id)
         .eq("status", "BOOKED")
-        .order("date", desc=False)
-        .order("time", desc=False)
-        .execute()
     )
 
-    return result.data
+    if not booked.data:
+        return {"error": "SLOT_ALREADY_BOOKED"}
+
+    return booked.data[0]
+
+async def db_release_holds(session_id: str):
+    await _execute(
+        get_supabase()
+        .table("appointments")
+        .delete()
+        .eq("session_id", session_id)
+        .eq("status", "HELD")
+    )
 
-def db_get_appointments(contact_number: str):
-    result = (
-        supabase
+async def db_get_appointments_page(
+    start_date: str,
+    end_date: Optional[str] = None,
+    contact_number: Optional[str] = None,
+    after: Optional[tuple[str, str]] = None,
+    limit: int = DB_PAGE_SIZE
+):
+    """
+    One page of BOOKED appointments in [start_date, end_date], ordered by
+    (date, time). Pass the (date, time) of the last row as `after` to get
+    the next page - keyset pagination, so deep pages cost the same as the
+    first. Active bookings are unique per slot, so (date, time) is a key.
+    """
+    query = (
+        get_supabase()
         .table("appointments")
         .select("id, date, time, status")
-        .eq("contact_number", contact_number)
         .eq("status", "BOOKED")
+        .gte("date", start_date)
+    )
+
+    if end_date is not None:
+        query = query.lte("date", end_date)
+
+    if contact_number is not None:
+        query = query.eq("contact_number", contact_number)
+
+    if after is not None:
+        after_date, after_time = after
+        # Values are double-quoted - ":" in times is reserved inside or=()
+        query = query.or_(
+            f'date.gt."{after_date}",'
+            f'and(date.eq."{after_date}",time.gt."{after_time}")'
+        )
+
+    result = await _execute(
+        query
         .order("date", desc=False)
         .order("time", desc=False)
-        .execute()
+        .limit(limit)
     )
 
     return result.data
 
-def db_cancel_appointment(appointment_id: str):
-    result = (
-        supabase
+async def db_get_all_appointments(
+    start_date: str,
+    end_date: Optional[str] = None,
+    contact_number: Optional[str] = None,
+    page_size: int = DB_PAGE_SIZE
+):
+    """
+    Every BOOKED appointment matching the filters, fetched page by page.
+    """
+    rows = []
+    after = None
+
+    while True:
+        page = await db_get_appointments_page(
+            start_date,
+            end_date,
+            contact_number=contact_number,
+            after=after,
+            limit=page_size
+        )
+        rows.extend(page)
+
+        if len(page) < page_size:
+            return rows
+
+        after = (page[-1]["date"], page[-1]["time"])
+
+async def db_get_booked_slots_between(start_date: str, end_date: str):
+    """
+    All BOOKED appointments in [start_date, end_date].
+    """
+    return await db_get_all_appointments(start_date, end_date)
+
+async def db_get_active_holds_between(start_date: str, end_date: str):
+    """
+    Slots held right now (unexpired HELD rows) in [start_date, end_date].
+    Holds are short-lived, so this is one page.
+    """
+    result = await _execute(
+        get_supabase()
+        .table("appointments")
+        .select("id, date, time, status, session_id")
+        .eq("status", "HELD")
+        .gt("held_until", datetime.now(timezone.utc).isoformat())
+        .gte("date", start_date)
+        .lte("date", end_date)
+    )
+
+    return result.data
+
+async def db_get_taken_slots_between(start_date: str, end_date: str):
+    """
+    Slots nobody else can have in [start_date, end_date]: BOOKED rows and
+    unexpired holds.
+    """
+    booked, held = await asyncio.gather(
+        db_get_booked_slots_between(start_date, end_date),
+        db_get_active_holds_between(start_date, end_date)
+    )
+    return booked + held
+
+async def db_get_upcoming_appointments(
+    contact_number: str,
+    from_date: Optional[str] = None
+):
+    """
+    All of the caller's BOOKED appointments from today (or from_date)
+    onwards - usually a single page.
+    """
+    return await db_get_all_appointments(
+        from_date or datetime.now().date().isoformat(),
+        contact_number=contact_number
+    )
+
+async def db_cancel_appointment(appointment_id: str):
+    result = await _execute(
+        get_supabase()
         .table("appointments")
         .update({ "status": "CANCELLED" })
         .eq("id", appointment_id)
-        .execute()
     )
 
     if not result.data:
@@ -84,42 +424,187 @@ def db_cancel_appointment(appointment_id: str):
 
     return result.data[0]
 
-def db_modify_appointment(
+async def db_modify_appointment(
     appointment_id: str,
+    session_id: str,
+    contact_number: str,
     new_date: str,
     new_time: str
 ):
+    """
+    Moves one of the caller's BOOKED appointments to a new slot in a single
+    round trip via the reschedule_appointment() DB function - either it moves or
+    nothing changes.
+    """
     try:
-        result = (
-            supabase
-            .table("appointments")
-            .update({
-                "date": new_date,
-                "time": new_time
+        result = await _execute(
+            get_supabase().rpc("reschedule_appointment", {
+                "p_appointment_id": appointment_id,
+                "p_session_id": session_id,
+                "p_contact_number": contact_number,
+                "p_new_date": new_date,
+                "p_new_time": new_time
             })
-            .eq("id", appointment_id)
-            .execute()
         )
-
-        if not result.data:
-            return {"error": "APPOINTMENT_NOT_FOUND"}
-
-        return result.data[0]
-
+    except DatabaseUnavailableError:
+        raise
     except Exception as e:
-        if "unique_active_slot" in str(e):
+        if getattr(e, "code", None) == UNIQUE_VIOLATION:
             return {"error": "SLOT_ALREADY_BOOKED"}
+        _raise_if_not_deployed(e, "reschedule_appointment")
         raise
 
-def save_call_summary(session_id: str, contact_number: str, summary: str):
+    row = result.data[0] if isinstance(result.data, list) else result.data
+    # No row (or an all-null one) - not the caller's active appointment
+    if not row or row.get("id") is None:
+        return {"error": "APPOINTMENT_NOT_FOUND"}
+
+    return row
+
+class BufferedWriter:
+    """
+    Collects rows for one table and writes them in a single multi-row
+    request once max_rows are buffered or max_delay seconds have passed.
+    Rows are upserted on their unique `key`, so retrying a flush is safe.
+
+    add() is fire-and-forget - rows from a failed flush are kept and retried
+    with the next one. write() flushes right away, taking any buffered rows
+    along: a job process serves one call, so a row someone awaits would
+    rarely get company worth waiting max_delay for. It raises if the flush
+    fails, for callers that retry on their own.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        key: str,
+        max_rows: int = WRITE_BATCH_ROWS,
+        max_delay: float = WRITE_BATCH_DELAY,
+        max_buffer: int = WRITE_BUFFER_MAX_ROWS
+    ):
+        self._table = table
+        self._key = key
+        self._max_rows = max_rows
+        self._max_delay = max_delay
+        self._max_buffer = max_buffer
+        self._rows: list[tuple[dict, Optional[asyncio.Future]]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def add(self, row: dict) -> None:
+        self._buffer(row, None)
+
+    async def write(self, row: dict) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._rows.append((row, future))
+        self._start_flush()
+        return await future
+
+    async def flush(self) -> None:
+        if not self._rows:
+            return
+
+        rows, self._rows = self._rows, []
+        try:
+            # Upsert on the row key - a retried batch that already landed
+            # (e.g. committed after the deadline) adds no duplicates
+            result = await _execute(
+                get_supabase().table(self._table).upsert(
+                    [row for row, _ in rows],
+                    on_conflict=self._key,
+                    ignore_duplicates=True
+                )
+            )
+        except Exception as e:
+            retry = [(row, future) for row, future in rows if future is None]
+            for _, future in rows:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+
+            dropped = max(0, len(retry) + len(self._rows) - self._max_buffer)
+            self._rows = (retry + self._rows)[dropped:]
+            logger.warning(
+                "Batched insert into %s failed (%d rows, %d kept for retry, %d dropped)",
+                self._table,
+                len(rows),
+                len(retry) - min(dropped, len(retry)),
+                dropped,
+                exc_info=True
+            )
+            self._arm_timer()
+            return
+
+        # Rows that were already there aren't returned
+        written = {data[self._key]: data for data in result.data}
+        for row, future in rows:
+            if future is not None and not future.done():
+                future.set_result(written.get(row[self._key], row))
+
+    async def close(self) -> None:
+        """
+        Flushes everything buffered; called on worker shutdown.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+
+    def _buffer(self, row: dict, future: Optional[asyncio.Future]) -> None:
+        self._rows.append((row, future))
+
+        if len(self._rows) >= self._max_rows:
+            self._start_flush()
+        else:
+            self._arm_timer()
+
+    def _arm_timer(self) -> None:
+        if self._rows and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.create_task(self._flush_after_delay())
+
+    async def _flush_after_delay(self) -> None:
+        await asyncio.sleep(self._max_delay)
+        self._start_flush()
+
+    def _start_flush(self) -> None:
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+
+summary_writer = BufferedWriter("call_summaries", key="session_id")
+tool_event_writer = BufferedWriter("tool_events", key="event_id")
+
+
+async def flush_writers() -> None:
+    await asyncio.gather(summary_writer.close(), tool_event_writer.close())
+
+
+async def save_call_summary(session_id: str, contact_number: str, summary: str):
     """
-    Persists the call summary with timestamp.
+    Persists the call summary with timestamp, without waiting for a batch.
     """
 
-    result = supabase.table("call_summaries").insert({
+    return await summary_writer.write({
         "session_id": session_id,
         "contact_number": contact_number,
         "summary": summary
-    }).execute()
+    })
+
 
-    return result.data[0]
\ No newline at end of file
+def save_tool_event(session_id: str, event: dict) -> None:
+    """
+    Queues a tool event for the audit trail; never waits on the DB.
+    """
+
+    tool_event_writer.add({
+        "event_id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "tool": event["tool"],
+        "phase": event["phase"],
+        "payload": event["payload"],
+        "created_at": datetime.fromtimestamp(
+            event["timestamp"], timezone.utc
+        ).isoformat()
+    })
@@ -0,0 +1,101 @@
+import hashlib
+import re
+
+# The Assistant's system prompt, built once at import.
+#
+# Kept compact and static: it is resent on every LLM turn, and providers
+# cache a request's identical leading tokens (instructions, then tool
+# schemas), so nothing per-call (dates, caller details, slots) goes in
+# here - that belongs in the conversation. Tools are described by their
+# function_tool schemas, so they aren't listed here; only the rules for
+# how to use them together are.
+
+PREAMBLE = (
+    "You are a voice assistant that books and manages appointments over "
+    "the phone. Speak in a calm, friendly, professional tone. Follow these "
+    "rules strictly."
+)
+
+SECTIONS = (
+    ("Speech", (
+        "Reply in short, natural spoken English; no markdown, emojis or lists.",
+        "Never mention internal systems, tools or databases.",
+        "Handle one request at a time and keep track of the conversation.",
+    )),
+    ("Identification", (
+        "Callers are identified by phone number. Before booking, retrieving, "
+        "modifying or cancelling, ask for it and call identify_user.",
+    )),
+    ("Tools", (
+        "Call tools without any spoken text, then continue naturally from "
+        "the result.",
+    )),
+    ("Dates and times", (
+        "Take dates and times only from what the caller says; use "
+        "YYYY-MM-DD and 24-hour HH:MM:SS.",
+        "If a date or time is missing or ambiguous, ask instead of guessing.",
+    )),
+    ("Booking", (
+        "Offer only slots returned by fetch_slots; never book any other time.",
+        "When the caller picks a slot, call hold_slot, confirm the details, "
+        "then call book_appointment.",
+        "If a slot is unavailable, say so politely and ask for another.",
+        "Confirm the booking details aloud once booked.",
+    )),
+    ("Changes", (
+        "Retrieve the caller's appointments and confirm which one to modify "
+        "or cancel; ask if it's unclear.",
+        "Confirm the final state after a change.",
+    )),
+    ("Ending", (
+        "When the caller is done or says goodbye, call end_conversation and "
+        "end politely.",
+    )),
+    ("Uncertainty", (
+        "If unsure what the caller wants, ask a brief clarifying question.",
+        "Never invent appointments, dates, confirmations or facts about the "
+        "caller, and never assume intent without confirmation.",
+        "Politely decline harmful requests and anything unrelated to "
+        "appointments.",
+    )),
+)
+
+
+def build_instructions(preamble: str = PREAMBLE, sections=SECTIONS) -> str:
+    """
+    Renders the prompt as plain headed rule lists. Deterministic, so the
+    text - and the provider's cached prefix - is identical on every turn
+    and every call.
+    """
+    parts = [preamble]
+    for title, rules in sections:
+        parts.append(f"{title}:\n" + "\n".join(f"- {rule}" for rule in rules))
+    return "\n\n".join(parts)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough BPE token count (words and punctuation marks), close enough
+    for comparing prompt versions without a tokenizer dependency.
+    """
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+
+def token_report(preamble: str = PREAMBLE, sections=SECTIONS) -> dict:
+    report = {"preamble": estimate_tokens(preamble)}
+    for title, rules in sections:
+        report[title] = estimate_tokens(title) + sum(estimate_tokens(rule) for rule in rules)
+    report["total"] = estimate_tokens(build_instructions(preamble, sections))
+    return report
+
+
+INSTRUCTIONS = build_instructions()
+
+# Routes every call's requests to the same provider-side prompt cache;
+# changes whenever the prompt does
+PROMPT_CACHE_KEY = "assistant-" + hashlib.sha1(INSTRUCTIONS.encode("utf-8")).hexdigest()[:12]
+
+
+if __name__ == "__main__":
+    for part, tokens in token_report().items():
+        print(f"{part:<16} {tokens:>5}")
@@ -0,0 +1,162 @@
+import os
+from bisect import bisect_left
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+WEEKDAYS = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+
+
+def _parse_time(value: str) -> time:
+    return time.fromisoformat(value.strip())
+
+
+def make_slot(day: str, slot_time: str) -> dict:
+    return {
+        "slot_id": f"{day}T{slot_time}",
+        "date": day,
+        "time": slot_time
+    }
+
+
+@dataclass(frozen=True)
+class SlotSchedule:
+    """
+    Working-hours calendar that candidate appointment slots are generated
+    from. A working day is a fixed sequence of slot start times, so one
+    day's availability is a bitmask over that sequence (bit i = i-th slot).
+    """
+    open_time: time = time(9, 0)
+    close_time: time = time(17, 0)
+    slot_minutes: int = 30
+    breaks: tuple[tuple[time, time], ...] = ((time(13, 0), time(14, 0)),)
+    working_days: frozenset[int] = frozenset(range(5))  # Mon-Fri
+    holidays: frozenset[str] = frozenset()
+
+    # Derived from the fields above in __post_init__
+    day_times: tuple[str, ...] = field(init=False, repr=False)
+    _positions: dict = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        times = []
+        start = datetime.combine(date.min, self.open_time)
+        close = datetime.combine(date.min, self.close_time)
+        step = timedelta(minutes=self.slot_minutes)
+
+        while start + step <= close:
+            end = start + step
+            overlaps_break = any(
+                start.time() < break_end and end.time() > break_start
+                for break_start, break_end in self.breaks
+            )
+            if not overlaps_break:
+                times.append(start.time().isoformat())
+            start = end
+
+        object.__setattr__(self, "day_times", tuple(times))
+        object.__setattr__(
+            self, "_positions", {t: i for i, t in enumerate(times)}
+        )
+
+    @classmethod
+    def from_env(cls) -> "SlotSchedule":
+        """
+        Builds the schedule from SLOT_* environment variables, falling back
+        to the defaults above for anything unset.
+        """
+        kwargs = {}
+
+        if os.environ.get("SLOT_OPEN_TIME"):
+            kwargs["open_time"] = _parse_time(os.environ["SLOT_OPEN_TIME"])
+        if os.environ.get("SLOT_CLOSE_TIME"):
+            kwargs["close_time"] = _parse_time(os.environ["SLOT_CLOSE_TIME"])
+        if os.environ.get("SLOT_MINUTES"):
+            kwargs["slot_minutes"] = int(os.environ["SLOT_MINUTES"])
+        # "13:00-14:00,16:00-16:15"; set to an empty string for no breaks
+        if "SLOT_BREAKS" in os.environ:
+            kwargs["breaks"] = tuple(
+                tuple(_parse_time(part) for part in span.split("-"))
+                for span in os.environ["SLOT_BREAKS"].split(",")
+                if span.strip()
+            )
+        # "MON,TUE,WED,THU,FRI"
+        if os.environ.get("SLOT_WORKING_DAYS"):
+            kwargs["working_days"] = frozenset(
+                WEEKDAYS.index(day.strip().upper()[:3])
+                for day in os.environ["SLOT_WORKING_DAYS"].split(",")
+            )
+        # "2026-12-25,2027-01-01"
+        if os.environ.get("SLOT_HOLIDAYS"):
+            kwargs["holidays"] = frozenset(
+                day.strip() for day in os.environ["SLOT_HOLIDAYS"].split(",")
+            )
+
+        return cls(**kwargs)
+
+    @property
+    def full_mask(self) -> int:
+        return (1 << len(self.day_times)) - 1
+
+    def is_working_day(self, day: date) -> bool:
+        return (
+            day.weekday() in self.working_days
+            and day.isoformat() not in self.holidays
+        )
+
+    def is_valid_slot(self, day: str, slot_time: str) -> bool:
+        try:
+            parsed = date.fromisoformat(day)
+        except ValueError:
+            return False
+
+        return self.is_working_day(parsed) and slot_time in self._positions
+
+    def mask_for(self, times: Iterable[str]) -> int:
+        """
+        Bitmask of the given slot start times; unknown times are ignored.
+        """
+        mask = 0
+        for slot_time in times:
+            position = self._positions.get(slot_time)
+            if position is not None:
+                mask |= 1 << position
+        return mask
+
+    def iter_days(self, start: date, days: int) -> Iterator[date]:
+        for offset in range(days + 1):
+            day = start + timedelta(days=offset)
+            if self.is_working_day(day):
+                yield day
+
+    def iter_available(
+        self,
+        start: date,
+        days: int,
+        booked: Mapping[str, Iterable[str]],
+        not_before: Optional[datetime] = None
+    ) -> Iterator[dict]:
+        """
+        Lazily yields free slots from start through start + days, in order.
+        `booked` maps ISO date -> booked slot times for that day. Slots
+        starting before `not_before` (e.g. now) are skipped.
+        """
+        for day in self.iter_days(start, days):
+            iso_day = day.isoformat()
+            free = self.full_mask & ~self.mask_for(booked.get(iso_day, ()))
+
+            if not_before is not None:
+                if day < not_before.date():
+                    continue
+                if day == not_before.date():
+                    # day_times is sorted, so elapsed slots are the low bits
+                    elapsed = bisect_left(
+                        self.day_times, not_before.time().isoformat()
+                    )
+                    free &= ~((1 << elapsed) - 1)
+
+            while free:
+                low_bit = free & -free
+                slot_time = self.day_times[low_bit.bit_length() - 1]
+                yield make_slot(iso_day, slot_time)
+                free ^= low_bit
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from livekit.agents import get_job_context
+
+from latency import LatencyBudget
+from tool_scheduler import ToolScheduler
+
+logger = logging.getLogger("agent")
+
+
+@dataclass
+class SessionState:
+    """
+    Per-call state. One instance per job, created when the job starts and
+    dropped from the registry on shutdown.
+    """
+    session_id: str
+    user_identified: bool = False
+    contact_number: Optional[str] = None
+    # Caller ID of a phone (SIP) caller, digits only
+    caller_number: Optional[str] = None
+    available_slots: Optional[list] = None
+    # Todo - convert to typed object
+    user_appointments: Optional[list] = None
+    transcripts: list = field(default_factory=list)
+    tool_calls: list = field(default_factory=list)
+    latency: LatencyBudget = field(default_factory=LatencyBudget)
+    # Orders this call's concurrent tool calls (see TOOL_ACCESS)
+    tools: ToolScheduler = field(default_factory=ToolScheduler)
+    # Turn (speech_id) that last got a filler - at most one per turn
+    filler_speech_id: Optional[str] = None
+    # Fire-and-forget tasks of this call; the loop only keeps weak refs
+    background_tasks: set = field(default_factory=set)
+
+    def keep_task(self, task: asyncio.Task) -> asyncio.Task:
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+
+# Registry of live calls in this process, keyed by job id
+_sessions: dict[str, SessionState] = {}
+
+
+def create_session_state(session_id: str) -> SessionState:
+    state = SessionState(session_id=session_id)
+    _sessions[session_id] = state
+    return state
+
+
+def get_session_state(session_id: Optional[str] = None) -> SessionState:
+    """
+    Returns the state for the given job id, defaulting to the current job.
+    """
+    if session_id is None:
+        session_id = get_job_context().job.id
+
+    state = _sessions.get(session_id)
+    if state is None:
+        # Tools can run before my_agent registered the job (e.g. in evals)
+        state = create_session_state(session_id)
+
+    return state
+
+
+def remove_session_state(session_id: str) -> None:
+    if _sessions.pop(session_id, None) is not None:
+        logger.debug("Released session state for %s", session_id)
@@ -1,47 +1,110 @@
+from dataclasses import asdict, dataclass, field
+from functools import cache
+from pathlib import Path
+from typing import Optional
+import asyncio
 import json
-from openai import OpenAI
+import logging
+import os
 
-client = OpenAI()
+from openai import AsyncOpenAI
 
-async def generate_call_summary(session) -> str:
+from logs import log_debug
+from model import save_call_summary
+
+
+logger = logging.getLogger("agent")
+
+
+@cache
+def get_openai_client() -> AsyncOpenAI:
     """
-    Generates a concise call summary using transcript + tool events.
-    Returns plain text summary.
+    Created on first summary, so importing this module needs no API key.
+    """
+    return AsyncOpenAI()
+
+
+# Finished calls waiting for a summary are spooled here until saved, so a
+# job process exiting mid-summary never loses one
+SUMMARY_SPOOL_DIR = Path(os.environ.get("SUMMARY_SPOOL_DIR", ".summary_spool"))
+SUMMARY_CONCURRENCY = int(os.environ.get("SUMMARY_CONCURRENCY", "2"))
+SUMMARY_MAX_ATTEMPTS = int(os.environ.get("SUMMARY_MAX_ATTEMPTS", "4"))
+# Summaries already queued together (e.g. replayed from the spool) are
+# generated in one request, up to this many
+SUMMARY_BATCH_SIZE = int(os.environ.get("SUMMARY_BATCH_SIZE", "10"))
+
+SUMMARY_INSTRUCTIONS = """- Summarize the conversation in 3–5 bullet points.
+- Clearly list any appointments that were booked, modified, or cancelled.
+- Extract user preferences if mentioned (time of day, date preference).
+- Be factual and concise.
+- Do NOT invent information."""
+
+
+@dataclass
+class SummaryJob:
+    """
+    Snapshot of a finished call - everything the summary needs, detached
+    from the live session state.
     """
+    session_id: str
+    contact_number: Optional[str]
+    transcripts: list = field(default_factory=list)
+    tool_calls: list = field(default_factory=list)
+    # Set once generated, so a failed save doesn't pay for the LLM again
+    summary: Optional[str] = None
+    attempts: int = 0
+
+    @classmethod
+    def from_state(cls, state) -> "SummaryJob":
+        return cls(
+            session_id=state.session_id,
+            contact_number=state.contact_number,
+            transcripts=list(state.transcripts),
+            tool_calls=list(state.tool_calls)
+        )
 
-    # ---- Build compact inputs (important for latency) ----
+
+def _call_digest(session) -> str:
+    """
+    Compact transcript + tool activity for one call (important for latency).
+    """
     transcript_text = "\n".join(
         f"{t['role']}: {t['content']}"
-        for t in session["transcripts"][-20:]   # last N turns is enough
+        for t in session.transcripts[-20:]   # last N turns is enough
     )
 
     tool_events_text = "\n".join(
         f"{e['tool']} ({e['phase']}): {json.dumps(e.get('payload', {}))}"
-        for e in session["tool_calls"]
+        for e in session.tool_calls
         if e['phase'] in ["success", "error"]
     )
 
-    prompt = f"""
-You are generating a concise call summary for an AI appointment assistant.
-
-Conversation transcript:
+    return f"""Conversation transcript:
 {transcript_text}
 
 Tool activity:
 {tool_events_text}
 
 Known user:
-- Contact number: {session["contact_number"]}
+- Contact number: {session.contact_number}"""
+
+
+async def generate_call_summary(session) -> str:
+    """
+    Generates a concise call summary using transcript + tool events.
+    Returns plain text summary.
+    """
+
+    prompt = f"""
+You are generating a concise call summary for an AI appointment assistant.
+
+{_call_digest(session)}
 
 Instructions:
-- Summarize the conversation in 3–5 bullet points.
-- Clearly list any appointments that were booked, modified, or cancelled.
-- Extract user preferences if mentioned (time of day, date preference).
-- Be factual and concise.
-- Do NOT invent information.
+{SUMMARY_INSTRUCTIONS}
 """
 
-    response = client.responses.create(
+    response = await get_openai_client().responses.create(
         model="gpt-4.1-mini",
         input=prompt,
         max_output_tokens=250
@@ -51,3 +114,255 @@ Instructions:
     summary_text = response.output_text.strip()
 
     return summary_text
+
+
+async def generate_call_summaries(sessions: list) -> dict[str, str]:
+    """
+    Summarizes several finished calls in a single request.
+    Returns {session_id: summary}; calls the model skipped are left out.
+    """
+
+    calls_text = "\n\n".join(
+        f"### Call {session.session_id}\n{_call_digest(session)}"
+        for session in sessions
+    )
+
+    prompt = f"""
+You are generating concise call summaries for an AI appointment assistant.
+Summarize each call below independently - never mix details between calls.
+
+{calls_text}
+
+Instructions for each summary:
+{SUMMARY_INSTRUCTIONS}
+
+Respond with a JSON object mapping each call id to its summary as a string.
+"""
+
+    response = await get_openai_client().responses.create(
+        model="gpt-4.1-mini",
+        input=prompt,
+        max_output_tokens=250 * len(sessions),
+        text={"format": {"type": "json_object"}}
+    )
+
+    summaries = json.loads(response.output_text)
+
+    return {
+        session.session_id: summaries[session.session_id].strip()
+        for session in sessions
+        if isinstance(summaries.get(session.session_id), str)
+    }
+
+
+class SummaryQueue:
+    """
+    Background pipeline for call summaries: generate with the LLM, then
+    save to the DB, off the call's critical path.
+
+    A job process hosts a single call, so usually there is one job. When
+    several are already queued - the call's own plus spool files replayed
+    from exited processes - a worker takes up to batch_size of them and
+    summarizes them in one LLM request. It never waits for more to arrive.
+
+    Jobs are spooled to disk on enqueue and removed once saved. Spool files
+    are named <session_id>.<pid>.json; files left behind by a process that
+    is gone are picked up again by replay_spool().
+    """
+
+    def __init__(
+        self,
+        spool_dir: Path = SUMMARY_SPOOL_DIR,
+        concurrency: int = SUMMARY_CONCURRENCY,
+        max_attempts: int = SUMMARY_MAX_ATTEMPTS,
+        batch_size: int = SUMMARY_BATCH_SIZE
+    ):
+        self._spool_dir = spool_dir
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        # session_id -> coroutine fn called with the summary once saved
+        self._callbacks = {}
+
+    def enqueue(self, job: SummaryJob, on_summary=None) -> None:
+        self._spool(job)
+        if on_summary is not None:
+            self._callbacks[job.session_id] = on_summary
+
+        self._ensure_workers()
+        self._queue.put_nowait(job)
+
+    def replay_spool(self) -> int:
+        """
+        Re-enqueues jobs spooled by processes that exited before saving
+        them. Returns the number of jobs claimed.
+        """
+        if not self._spool_dir.is_dir():
+            return 0
+
+        claimed = 0
+        for path in self._spool_dir.glob("*.json"):
+            session_id, _, pid = path.stem.rpartition(".")
+            if not pid.isdigit() or _pid_alive(int(pid)):
+                continue
+
+            # Atomic rename - if another process claimed it first we lose
+            try:
+                path = path.rename(self._spool_path(session_id))
+            except FileNotFoundError:
+                continue
+
+            try:
+                job = SummaryJob(**json.loads(path.read_text()))
+            except (ValueError, TypeError):
+                logger.exception("Dropping unreadable summary spool file %s", path)
+                path.unlink(missing_ok=True)
+                continue
+
+            self._ensure_workers()
+            self._queue.put_nowait(job)
+            claimed += 1
+
+        if claimed:
+            logger.info("Replaying %d spooled call summaries", claimed)
+
+        return claimed
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Waits up to `timeout` seconds for queued summaries to be saved.
+        Anything unfinished stays spooled for the next process.
+        """
+        if self._queue is None:
+            return True
+
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(
+                "%d call summaries still pending at shutdown - left in spool",
+                self._queue.qsize()
+            )
+            return False
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+
+        self._workers = [task for task in self._workers if not task.done()]
+        while len(self._workers) < self._concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    async def _worker(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._process_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _next_batch(self) -> list[SummaryJob]:
+        batch = [await self._queue.get()]
+
+        # Only what's already queued - a lone call's summary starts at once
+        while len(batch) < self._batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    async def _process_batch(self, batch: list[SummaryJob]) -> None:
+        pending = [job for job in batch if job.summary is None]
+
+        if len(pending) > 1:
+            try:
+                summaries = await generate_call_summaries(pending)
+                for job in pending:
+                    job.summary = summaries.get(job.session_id)
+                logger.info(
+                    "Batched %d/%d call summaries in one request",
+                    len(summaries),
+                    len(pending)
+                )
+            except Exception:
+                # Each job falls back to its own request in _process
+                logger.warning("Batched call summary failed", exc_info=True)
+
+        results = await asyncio.gather(
+            *(self._process(job) for job in batch),
+            return_exceptions=True
+        )
+        for job, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "Call summary failed for %s",
+                    job.session_id,
+                    exc_info=result
+                )
+
+    async def _process(self, job: SummaryJob) -> None:
+        while True:
+            job.attempts += 1
+            try:
+                if job.summary is None:
+                    job.summary = await generate_call_summary(job)
+                    log_debug("Call summary", session=job.session_id, summary=job.summary)
+
+                await save_call_summary(
+                    session_id=job.session_id,
+                    contact_number=job.contact_number,
+                    summary=job.summary
+                )
+                logger.info("Summary saved to DB for %s", job.session_id)
+                break
+
+            except Exception:
+                if job.attempts >= self._max_attempts:
+                    # Keep it on disk; a later process can replay it
+                    self._spool(job)
+                    raise
+
+                logger.warning(
+                    "Call summary attempt %d failed for %s, retrying",
+                    job.attempts,
+                    job.session_id,
+                    exc_info=True
+                )
+                self._spool(job)
+                await asyncio.sleep(min(2 ** job.attempts, 30))
+
+        self._spool_path(job.session_id).unlink(missing_ok=True)
+
+        on_summary = self._callbacks.pop(job.session_id, None)
+        if on_summary is not None:
+            try:
+                await on_summary(job.summary)
+            except Exception:
+                logger.exception("Call summary callback failed")
+
+    def _spool_path(self, session_id: str) -> Path:
+        return self._spool_dir / f"{session_id}.{os.getpid()}.json"
+
+    def _spool(self, job: SummaryJob) -> None:
+        self._spool_dir.mkdir(parents=True, exist_ok=True)
+        path = self._spool_path(job.session_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(job), default=str))
+        tmp.replace(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# One pipeline per process, shared by every call it hosts
+summary_queue = SummaryQueue()
@@ -0,0 +1,115 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+
+import prometheus_client
+from livekit.agents.telemetry import set_tracer_provider
+
+logger = logging.getLogger("agent")
+
+# Worker-wide Prometheus text endpoint (":<port>/metrics") served by
+# AgentServer; unset to disable
+PROMETHEUS_PORT = os.environ.get("PROMETHEUS_PORT")
+# Job processes write their samples here for the endpoint to aggregate
+PROMETHEUS_MULTIPROC_DIR = os.environ.get(
+    "PROMETHEUS_MULTIPROC_DIR", ".prometheus_multiproc"
+)
+
+# Tool calls are mostly tens to hundreds of milliseconds
+TOOL_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+TOOL_LATENCY = prometheus_client.Histogram(
+    "agent_tool_latency_seconds",
+    "Tool call latency, split into time spent in the DB, publishing events, and total",
+    ["tool", "part"],
+    buckets=TOOL_LATENCY_BUCKETS,
+)
+TOOL_CALLS = prometheus_client.Counter(
+    "agent_tool_calls_total",
+    "Tool calls by outcome (ok or the returned error code)",
+    ["tool", "outcome"],
+)
+ROOM_EVENT_SEND = prometheus_client.Histogram(
+    "agent_room_event_send_seconds",
+    "Data-channel send latency of batched room events (off the tool path)",
+    buckets=TOOL_LATENCY_BUCKETS,
+)
+
+
+@dataclass
+class ToolTiming:
+    """
+    Time spent by one tool call, accumulated while it runs.
+    """
+    tool: str
+    started: float
+    db: float = 0.0
+    publish: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+
+# Timing of the tool call running in the current task, if any
+_current_tool: ContextVar[Optional[ToolTiming]] = ContextVar("current_tool", default=None)
+
+
+@contextmanager
+def time_tool(tool: str):
+    timing = ToolTiming(tool=tool, started=time.perf_counter())
+    token = _current_tool.set(timing)
+    try:
+        yield timing
+    finally:
+        _current_tool.reset(token)
+
+
+def record_db_time(seconds: float) -> None:
+    timing = _current_tool.get()
+    if timing is not None:
+        timing.db += seconds
+
+
+def record_publish_time(seconds: float) -> None:
+    timing = _current_tool.get()
+    if timing is not None:
+        timing.publish += seconds
+
+
+def observe_tool(timing: ToolTiming, outcome: str) -> float:
+    """
+    Records a finished tool call in the histograms. Returns its total
+    duration in seconds.
+    """
+    total = timing.total
+    TOOL_LATENCY.labels(timing.tool, "db").observe(timing.db)
+    TOOL_LATENCY.labels(timing.tool, "publish").observe(timing.publish)
+    TOOL_LATENCY.labels(timing.tool, "total").observe(total)
+    TOOL_CALLS.labels(timing.tool, outcome).inc()
+    return total
+
+
+def setup_tracing() -> None:
+    """
+    Exports spans to an OTLP collector when OTEL_EXPORTER_OTLP_ENDPOINT is
+    set (the exporter reads the standard OTEL_* variables). Tool and DB
+    spans nest under the framework's function_tool span, next to its
+    LLM/TTS spans for the same turn.
+    """
+    if not os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"):
+        return
+
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider()
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    set_tracer_provider(provider)
+    logger.info("Exporting traces to %s", os.environ["OTEL_EXPORTER_OTLP_ENDPOINT"])
+
@@ -0,0 +1,72 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class ToolScheduler:
+    """
+    Per-call reader/writer scheduling for tool calls.
+
+    The framework runs every tool call of a turn as its own task. Read
+    tools run alongside each other; a write tool runs alone, after
+    everything issued before it and before everything issued after it.
+    Admission is strictly FIFO, so a steady stream of reads can't starve
+    a write and the model's call order is kept wherever it matters.
+    """
+
+    def __init__(self):
+        self._waiters: deque[tuple[str, asyncio.Future]] = deque()
+        self._readers = 0
+        self._writing = False
+
+    @asynccontextmanager
+    async def access(self, mode: str):
+        """
+        `mode` is "read" or "write".
+        """
+        admitted = asyncio.get_running_loop().create_future()
+        self._waiters.append((mode, admitted))
+        self._admit()
+
+        try:
+            await admitted
+        except asyncio.CancelledError:
+            # Admitted just as we were cancelled - hand the slot back
+            if admitted.done() and not admitted.cancelled():
+                self._release(mode)
+            else:
+                admitted.cancel()
+                self._admit()
+            raise
+
+        try:
+            yield
+        finally:
+            self._release(mode)
+
+    def _release(self, mode: str) -> None:
+        if mode == "read":
+            self._readers -= 1
+        else:
+            self._writing = False
+        self._admit()
+
+    def _admit(self) -> None:
+        while self._waiters:
+            mode, admitted = self._waiters[0]
+            if admitted.done():
+                # Cancelled while waiting
+                self._waiters.popleft()
+                continue
+
+            if self._writing:
+                return
+            if mode == "read":
+                self._readers += 1
+            elif self._readers:
+                return
+            else:
+                self._writing = True
+
+            self._waiters.popleft()
+            admitted.set_result(None)
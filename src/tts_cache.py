@@ -0,0 +1,336 @@
+import asyncio
+import contextlib
+import hashlib
+import logging
+import os
+import time
+import unicodedata
+import wave
+from collections import OrderedDict
+from collections.abc import AsyncIterable, AsyncIterator
+from pathlib import Path
+from typing import Callable, Optional
+
+from livekit import rtc
+from livekit.agents import tokenize, utils
+from livekit.agents import tts as agents_tts
+from livekit.agents.utils.audio import AudioByteStream
+
+logger = logging.getLogger("agent")
+
+# Phrase audio is kept here across job processes (a job process handles a
+# single call, so this is what makes phrases reusable between calls).
+# Set to "" to keep the cache in memory only.
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", ".tts_cache")
+# Clips kept on disk; the least recently used are pruned at prewarm
+TTS_CACHE_MAX_FILES = int(os.environ.get("TTS_CACHE_MAX_FILES", "1000"))
+# Audio kept in memory per process, least recently used evicted first
+TTS_CACHE_MAX_MB = float(os.environ.get("TTS_CACHE_MAX_MB", "32"))
+# Longer sentences are rarely repeated word for word
+TTS_CACHE_MAX_CHARS = 160
+# Sentences synthesized ahead of the one playing, so uncached sentences
+# don't add a TTS round trip between each other
+TTS_LOOKAHEAD = 2
+# LLM sentences that are saved to disk when spoken - fixed greetings and
+# goodbyes only. Anything else the LLM says may carry caller details, so
+# it is only cached in memory, for the current call.
+PERSISTED_PHRASES = (
+    "Hello! How can I help you today?",
+    "Hi! How can I help you today?",
+    "Is there anything else I can help you with?",
+    "Thank you for calling. Have a great day!",
+    "Thank you for calling. Goodbye!",
+    "Goodbye!",
+)
+
+
+def normalize_phrase(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+def is_cacheable(text: str) -> bool:
+    return 0 < len(text) <= TTS_CACHE_MAX_CHARS
+
+
+_PERSISTED = frozenset(map(normalize_phrase, PERSISTED_PHRASES))
+
+
+def is_persisted(text: str) -> bool:
+    return normalize_phrase(text) in _PERSISTED
+
+
+class PhraseCache:
+    """
+    Synthesized audio per (voice, normalized sentence): an in-memory LRU
+    bounded by bytes, backed by wav files on disk.
+
+    Only fixed phrases - fillers and PERSISTED_PHRASES - are put with
+    `persist=True` and reach the disk, shared by later calls. Everything
+    else stays in memory for the current call.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = TTS_CACHE_DIR,
+        max_bytes: int = int(TTS_CACHE_MAX_MB * 1024 * 1024),
+        max_files: int = TTS_CACHE_MAX_FILES
+    ):
+        self._dir = Path(cache_dir) if cache_dir else None
+        self._max_bytes = max_bytes
+        self._max_files = max_files
+        # key -> clip, least recently used first
+        self._clips: OrderedDict[str, rtc.AudioFrame] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self) -> int:
+        """
+        Prunes the disk cache to its file limit and loads the most recently
+        used clips into memory. Called once per process, in prewarm.
+        """
+        if self._dir is None or not self._dir.is_dir():
+            return 0
+
+        paths = sorted(
+            self._dir.glob("*.wav"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True
+        )
+        for path in paths[self._max_files:]:
+            path.unlink(missing_ok=True)
+
+        loaded = []
+        size = 0
+        for path in paths[:self._max_files]:
+            try:
+                clip = _read_wav(path)
+            except (OSError, wave.Error, EOFError):
+                logger.warning("Dropping unreadable TTS cache clip %s", path)
+                path.unlink(missing_ok=True)
+                continue
+
+            size += clip.data.nbytes
+            if size > self._max_bytes:
+                break
+            loaded.append((path.stem, clip))
+
+        # Oldest first, so the newest end up most recently used
+        for key, clip in reversed(loaded):
+            self._insert(key, clip)
+        return len(loaded)
+
+    def get(self, voice: str, text: str) -> Optional[rtc.AudioFrame]:
+        key = _phrase_key(voice, text)
+        clip = self._clips.get(key)
+        if clip is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._clips.move_to_end(key)
+        if self._dir is not None:
+            # Disk recency, for pruning
+            with contextlib.suppress(OSError):
+                os.utime(self._dir / f"{key}.wav")
+        return clip
+
+    def put(self, voice: str, text: str, clip: rtc.AudioFrame, persist: bool = False) -> None:
+        if not is_cacheable(normalize_phrase(text)):
+            return
+
+        key = _phrase_key(voice, text)
+        self._insert(key, clip)
+
+        if self._dir is not None and persist:
+            asyncio.get_running_loop().run_in_executor(
+                None, _save_clip, self._dir / f"{key}.wav", clip
+            )
+
+    def stats(self) -> dict:
+        return {
+            "phrases": len(self._clips),
+            "mb": round(self._bytes / (1024 * 1024), 1),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _insert(self, key: str, clip: rtc.AudioFrame) -> None:
+        old = self._clips.pop(key, None)
+        if old is not None:
+            self._bytes -= old.data.nbytes
+
+        self._clips[key] = clip
+        self._bytes += clip.data.nbytes
+        while self._bytes > self._max_bytes and len(self._clips) > 1:
+            _, evicted = self._clips.popitem(last=False)
+            self._bytes -= evicted.data.nbytes
+
+
+async def synthesize_cached(
+    tts: agents_tts.TTS,
+    voice: str,
+    text: AsyncIterable[str],
+    cache: PhraseCache,
+    conn_options=None,
+    on_cache_hit: Optional[Callable[[float], None]] = None
+) -> AsyncIterator[rtc.AudioFrame]:
+    """
+    A tts_node that splits the LLM's text into sentences and plays cached
+    sentences straight from memory. The rest are synthesized one sentence
+    per request (like the framework's StreamAdapter), up to TTS_LOOKAHEAD
+    sentences ahead of playback, and cached once complete.
+
+    Cached sentences make no TTS request, so no TTSMetrics; `on_cache_hit`
+    gets their time to first audio (the lookup) instead.
+    """
+    sentences = tokenize.blingfire.SentenceTokenizer(retain_format=True).stream()
+    # Sentences in playback order: a cached clip or a running synthesis
+    ahead: asyncio.Queue = asyncio.Queue(maxsize=TTS_LOOKAHEAD)
+    options = {"conn_options": conn_options} if conn_options else {}
+
+    async def forward_text():
+        async for chunk in text:
+            sentences.push_text(chunk)
+        sentences.end_input()
+
+    async def plan():
+        async for ev in sentences:
+            sentence = ev.token.strip()
+            if not sentence:
+                continue
+            started = time.perf_counter()
+            clip = cache.get(voice, sentence)
+            if clip is not None:
+                if on_cache_hit is not None:
+                    on_cache_hit(time.perf_counter() - started)
+                await ahead.put((sentence, clip))
+                continue
+
+            synthesis = _SentenceSynthesis(tts, sentence, options)
+            try:
+                await ahead.put((sentence, synthesis))
+            except asyncio.CancelledError:
+                synthesis.cancel()
+                raise
+        await ahead.put(None)
+
+    tasks = [
+        asyncio.create_task(forward_text()),
+        asyncio.create_task(plan())
+    ]
+    playing = None
+    try:
+        while (item := await ahead.get()) is not None:
+            sentence, source = item
+            if isinstance(source, rtc.AudioFrame):
+                async for frame in clip_frames(source):
+                    yield frame
+                continue
+
+            playing = source
+            frames = []
+            async for frame in source:
+                frames.append(frame)
+                yield frame
+            if frames:
+                cache.put(
+                    voice,
+                    sentence,
+                    rtc.combine_audio_frames(frames),
+                    persist=is_persisted(sentence)
+                )
+    finally:
+        # Interrupted, or a request failed - drop what's still synthesizing
+        await utils.aio.cancel_and_wait(*tasks)
+        if playing is not None:
+            playing.cancel()
+        while not ahead.empty():
+            item = ahead.get_nowait()
+            if item is not None and isinstance(item[1], _SentenceSynthesis):
+                item[1].cancel()
+        await sentences.aclose()
+
+
+class _SentenceSynthesis:
+    """
+    One sentence's TTS request, started right away and buffered until
+    its turn to play.
+    """
+
+    def __init__(self, tts: agents_tts.TTS, sentence: str, options: dict):
+        self._frames: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run(tts, sentence, options))
+
+    async def _run(self, tts, sentence, options):
+        try:
+            async with tts.synthesize(sentence, **options) as stream:
+                async for ev in stream:
+                    self._frames.put_nowait(ev.frame)
+        finally:
+            self._frames.put_nowait(None)
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    async def __aiter__(self):
+        try:
+            while (frame := await self._frames.get()) is not None:
+                yield frame
+            # Surface a failed request like the default tts_node would
+            await self._task
+        finally:
+            self._task.cancel()
+
+
+async def clip_frames(clip: rtc.AudioFrame) -> AsyncIterator[rtc.AudioFrame]:
+    """
+    Replays a clip as 20ms frames, like a TTS stream would deliver it.
+    """
+    stream = AudioByteStream(
+        clip.sample_rate,
+        clip.num_channels,
+        samples_per_channel=clip.sample_rate // 50
+    )
+    for frame in stream.push(clip.data.tobytes()):
+        yield frame
+    for frame in stream.flush():
+        yield frame
+
+
+def _phrase_key(voice: str, text: str) -> str:
+    phrase = normalize_phrase(text)
+    return hashlib.sha1(f"{voice}\n{phrase}".encode()).hexdigest()[:16]
+
+
+def _save_clip(path: Path, clip: rtc.AudioFrame) -> None:
+    try:
+        _write_wav(path, clip)
+    except OSError:
+        logger.warning("Saving TTS cache clip failed", exc_info=True)
+
+
+def _read_wav(path: Path) -> rtc.AudioFrame:
+    with wave.open(str(path), "rb") as wav:
+        return rtc.AudioFrame(
+            data=wav.readframes(wav.getnframes()),
+            sample_rate=wav.getframerate(),
+            num_channels=wav.getnchannels(),
+            samples_per_channel=wav.getnframes()
+        )
+
+
+def _write_wav(path: Path, clip: rtc.AudioFrame) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process - several job processes may write the same phrase
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with wave.open(str(tmp), "wb") as wav:
+        wav.setnchannels(clip.num_channels)
+        wav.setsampwidth(2)
+        wav.setframerate(clip.sample_rate)
+        wav.writeframes(clip.data.tobytes())
+    tmp.replace(path)
+
+
+# Shared by every call handled in this job process; loaded in prewarm
+phrase_cache = PhraseCache()
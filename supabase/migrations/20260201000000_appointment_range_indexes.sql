@@ -0,0 +1,8 @@
+-- Range-scoped reads filter on status + date/time (slot availability)
+-- and on contact_number + status (a caller's appointments).
+
+create index if not exists appointments_status_date_time_idx
+    on appointments (status, date, time);
+
+create index if not exists appointments_contact_status_idx
+    on appointments (contact_number, status);
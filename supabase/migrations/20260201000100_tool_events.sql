@@ -0,0 +1,19 @@
+-- Audit trail of tool calls, written in batches by tool_event_writer.
+-- event_id is generated by the agent, so a retried batch is an upsert
+-- that adds no duplicates.
+
+create table if not exists tool_events (
+    id bigint generated always as identity primary key,
+    event_id uuid not null unique,
+    session_id text not null,
+    tool text not null,
+    phase text not null,
+    payload jsonb,
+    created_at timestamptz not null default now()
+);
+
+-- Tables created before event_id existed
+alter table tool_events add column if not exists event_id uuid unique;
+
+create index if not exists tool_events_session_idx
+    on tool_events (session_id);
@@ -0,0 +1,5 @@
+-- One summary per call: summary_writer upserts on session_id, so a
+-- retried save doesn't write a second row.
+
+create unique index if not exists call_summaries_session_idx
+    on call_summaries (session_id);
@@ -0,0 +1,57 @@
+-- Slot holds. A HELD row reserves its slot until held_until and counts
+-- towards unique_active_slot, so it blocks other holds and bookings; once
+-- expired, the next reserve_slot() for that slot takes the row over.
+
+alter table appointments add column if not exists held_until timestamptz;
+
+-- unique_active_slot used to cover BOOKED rows only; replace it with one
+-- that covers HELD rows too. It may exist as a constraint or a plain index.
+alter table appointments drop constraint if exists unique_active_slot;
+drop index if exists unique_active_slot;
+create unique index unique_active_slot
+    on appointments (date, time) where status in ('BOOKED', 'HELD');
+
+-- Holds or books a slot in one round trip and drops any other hold the
+-- same call still has. If the call already booked the slot (a retry after
+-- a timed-out attempt that committed), returns that booking.
+create or replace function reserve_slot(
+    p_session_id text,
+    p_contact_number text,
+    p_date date,
+    p_time time,
+    p_status text,
+    p_hold_seconds int default null
+) returns appointments language plpgsql as $$
+declare
+    reserved appointments;
+    until timestamptz := case when p_status = 'HELD'
+        then now() + make_interval(secs => p_hold_seconds) end;
+begin
+    delete from appointments
+     where session_id = p_session_id and status = 'HELD'
+       and (date, time) <> (p_date, p_time);
+
+    select * into reserved from appointments
+     where date = p_date and time = p_time
+       and session_id = p_session_id and status = 'BOOKED';
+    if found then
+        return reserved;
+    end if;
+
+    update appointments
+       set session_id = p_session_id, contact_number = p_contact_number,
+           status = p_status, held_until = until
+     where date = p_date and time = p_time and status = 'HELD'
+       and (held_until < now() or session_id = p_session_id)
+    returning * into reserved;
+
+    if not found then
+        insert into appointments
+            (session_id, contact_number, date, time, status, held_until)
+        values
+            (p_session_id, p_contact_number, p_date, p_time, p_status, until)
+        returning * into reserved;
+    end if;
+
+    return reserved;
+end $$;
@@ -0,0 +1,38 @@
+-- Moves a BOOKED appointment to another slot in one statement. Consumes
+-- the call's own hold and any expired hold on the target; if another
+-- call has the slot, unique_violation rolls the whole thing back.
+-- If the appointment isn't the caller's BOOKED one, nothing is touched.
+-- Re-running it after it committed moves nothing and returns the row.
+
+create or replace function reschedule_appointment(
+    p_appointment_id bigint,
+    p_session_id text,
+    p_contact_number text,
+    p_new_date date,
+    p_new_time time
+) returns appointments language plpgsql as $$
+declare
+    moved appointments;
+begin
+    perform 1 from appointments
+     where id = p_appointment_id
+       and contact_number = p_contact_number
+       and status = 'BOOKED'
+       for update;
+    if not found then
+        return null;
+    end if;
+
+    delete from appointments
+     where status = 'HELD'
+       and (session_id = p_session_id
+            or (date = p_new_date and time = p_new_time
+                and held_until < now()));
+
+    update appointments
+       set date = p_new_date, time = p_new_time
+     where id = p_appointment_id
+    returning * into moved;
+
+    return moved;
+end $$;
@@ -1,13 +1,40 @@
+from datetime import date, timedelta
+
 import pytest
-from livekit.agents import AgentSession, inference, llm
+from livekit.agents import AgentSession, inference, llm, mock_tools
 
 from agent import Assistant
 
+CONTACT_NUMBER = "5551234567"
+
 
 def _llm() -> llm.LLM:
     return inference.LLM(model="openai/gpt-4.1-mini")
 
 
+def _booking_tools() -> dict:
+    """
+    Mocks for the tools a booking touches, so evals need no job or DB.
+    """
+    day = (date.today() + timedelta(days=1)).isoformat()
+    return {
+        "identify_user": lambda: {"status": "identified", "contact_number": CONTACT_NUMBER},
+        "retrieve_appointments": lambda: {"appointments": []},
+        "fetch_slots": lambda: {
+            "slots": [
+                {"date": day, "time": "10:00:00", "status": "AVAILABLE"},
+                {"date": day, "time": "14:00:00", "status": "AVAILABLE"},
+            ]
+        },
+        "hold_slot": lambda: {"status": "HELD", "date": day, "time": "10:00:00", "hold_seconds": 120},
+        "book_appointment": lambda: {"status": "CONFIRMED", "date": day, "time": "10:00:00"},
+    }
+
+
+def _called(result) -> list[str]:
+    return [event.item.name for event in result.events if event.type == "function_call"]
+
+
 @pytest.mark.asyncio
 async def test_offers_assistance() -> None:
     """Evaluation of the agent's friendly nature."""
@@ -108,3 +135,63 @@ async def test_refuses_harmful_request() -> None:
 
         # Ensures there are no function calls or other unexpected events
         result.expect.no_more_events()
+
+
+@pytest.mark.asyncio
+async def test_asks_for_phone_number_before_booking() -> None:
+    """Evaluation of the identify-before-booking rule."""
+    async with (
+        _llm() as llm,
+        AgentSession(llm=llm) as session,
+    ):
+        await session.start(Assistant())
+
+        with mock_tools(Assistant, _booking_tools()):
+            result = await session.run(
+                user_input="I'd like to book an appointment for tomorrow at 10 am."
+            )
+
+        # Nothing is held or booked for an unidentified caller
+        assert "hold_slot" not in _called(result)
+        assert "book_appointment" not in _called(result)
+
+        await (
+            result.expect.contains_message(role="assistant")
+            .judge(llm, intent="Asks the caller for their phone number.")
+        )
+
+
+@pytest.mark.asyncio
+async def test_identifies_caller_by_phone_number() -> None:
+    """Evaluation of identify_user being called once a number is given."""
+    async with (
+        _llm() as llm,
+        AgentSession(llm=llm) as session,
+    ):
+        await session.start(Assistant())
+
+        with mock_tools(Assistant, _booking_tools()):
+            await session.run(user_input="I'd like to book an appointment.")
+            result = await session.run(user_input="Sure, my number is 555 123 4567.")
+
+        result.expect.contains_function_call(name="identify_user")
+
+
+@pytest.mark.asyncio
+async def test_holds_slot_when_caller_picks_one() -> None:
+    """Evaluation of the hold-then-confirm booking flow."""
+    async with (
+        _llm() as llm,
+        AgentSession(llm=llm) as session,
+    ):
+        await session.start(Assistant())
+
+        with mock_tools(Assistant, _booking_tools()):
+            await session.run(
+                user_input="Hi, my number is 555 123 4567. What times do you have tomorrow?"
+            )
+            result = await session.run(user_input="The 10 am one, please.")
+
+        result.expect.contains_function_call(name="hold_slot")
+        # Held first; booked only once the caller confirms
+        assert "book_appointment" not in _called(result)
@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+import appointment_cache as cache_module
+from appointment_cache import AppointmentCache
+
+CONTACT = "5551234567"
+
+
+class Loader:
+    """
+    Fake appointment loader: returns `rows[contact]`, optionally held at
+    `gate` until the test lets the load finish.
+    """
+
+    def __init__(self, rows: dict[str, list[dict]]):
+        self.rows = rows
+        self.calls = 0
+        self.gate = None
+
+    async def __call__(self, contact_number: str) -> list[dict]:
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return list(self.rows.get(contact_number, []))
+
+
+@pytest.fixture
+def clock(monkeypatch) -> list[float]:
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _appointment(appointment_id: int, day: str, time: str = "09:00:00") -> dict:
+    return {"id": appointment_id, "date": day, "time": time, "status": "BOOKED", "contact_number": CONTACT}
+
+
+async def test_concurrent_misses_share_one_load() -> None:
+    loader = Loader({CONTACT: [_appointment(1, "2026-01-19")]})
+    cache = AppointmentCache(loader)
+    loader.gate = asyncio.Event()
+
+    cache.prefetch(CONTACT)
+    gets = [asyncio.create_task(cache.get(CONTACT)) for _ in range(2)]
+    await asyncio.sleep(0)
+    loader.gate.set()
+    lists = await asyncio.gather(*gets)
+
+    assert loader.calls == 1
+    # Trimmed to what tools see
+    assert lists[0] == lists[1] == [
+        {"id": 1, "date": "2026-01-19", "time": "09:00:00", "status": "BOOKED"}
+    ]
+
+
+async def test_load_that_raced_with_a_write_is_not_cached() -> None:
+    loader = Loader({CONTACT: [_appointment(1, "2026-01-19")]})
+    cache = AppointmentCache(loader)
+    loader.gate = asyncio.Event()
+
+    get = asyncio.create_task(cache.get(CONTACT))
+    # The DB read is under way when the write lands
+    await _settle()
+    assert loader.calls == 1
+    cache.upsert(CONTACT, _appointment(2, "2026-01-20"))
+    loader.gate.set()
+    await get
+
+    # The load may predate the write, so the next read goes to the DB
+    assert cache.peek(CONTACT) is None
+    await cache.get(CONTACT)
+    assert loader.calls == 2
+
+
+async def test_writes_go_through_to_a_cached_list() -> None:
+    loader = Loader({CONTACT: [_appointment(1, "2026-01-21")]})
+    cache = AppointmentCache(loader)
+    await cache.get(CONTACT)
+
+    cache.upsert(CONTACT, _appointment(2, "2026-01-19"))
+    cache.remove(CONTACT, 1)
+
+    assert [a["id"] for a in await cache.get(CONTACT)] == [2]
+    assert loader.calls == 1
+
+
+async def test_entries_expire_after_ttl(clock) -> None:
+    loader = Loader({CONTACT: []})
+    cache = AppointmentCache(loader, ttl=60)
+    await cache.get(CONTACT)
+
+    clock[0] += 59
+    assert cache.peek(CONTACT) == []
+
+    clock[0] += 2
+    assert cache.peek(CONTACT) is None
+    await cache.get(CONTACT)
+    assert loader.calls == 2
+
+
+async def test_least_recently_used_contact_is_evicted(clock) -> None:
+    loader = Loader({})
+    cache = AppointmentCache(loader, max_contacts=2)
+    await cache.get("1")
+    await cache.get("2")
+
+    cache.peek("1")
+    await cache.get("3")
+
+    assert cache.peek("1") == []
+    assert cache.peek("2") is None
+    assert cache.peek("3") == []
@@ -0,0 +1,104 @@
+import asyncio
+
+from availability import CallSlotHold, SlotAvailabilityIndex
+
+
+class Loader:
+    """
+    Fake slot loader: returns `rows`, optionally held at `gate` until the
+    test lets the load finish.
+    """
+
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.calls = 0
+        self.gate = None
+
+    async def __call__(self, start_date: str, end_date: str) -> list[dict]:
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        return list(self.rows)
+
+
+def _row(day: str, time: str) -> dict:
+    return {"date": day, "time": time}
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_local_writes_are_replayed_over_an_in_flight_refresh() -> None:
+    loader = Loader([_row("2026-01-19", "09:00:00")])
+    index = SlotAvailabilityIndex(loader)
+    loader.gate = asyncio.Event()
+
+    refresh = asyncio.create_task(index.refresh())
+    await _settle()
+
+    # Written while the snapshot is being read - it may predate them
+    index.mark_booked("2026-01-19", "10:00:00")
+    index.mark_free("2026-01-19", "09:00:00")
+    loader.gate.set()
+    await refresh
+
+    assert index.is_booked("2026-01-19", "10:00:00")
+    assert not index.is_booked("2026-01-19", "09:00:00")
+
+
+async def test_writes_before_a_refresh_give_way_to_the_snapshot() -> None:
+    loader = Loader([])
+    index = SlotAvailabilityIndex(loader)
+
+    index.mark_booked("2026-01-19", "10:00:00")
+    await index.refresh()
+
+    assert not index.is_booked("2026-01-19", "10:00:00")
+
+
+async def test_cold_lookups_share_one_load() -> None:
+    loader = Loader([_row("2026-01-19", "09:00:00")])
+    index = SlotAvailabilityIndex(loader)
+    loader.gate = asyncio.Event()
+
+    lookups = [asyncio.create_task(index.ensure_fresh()) for _ in range(3)]
+    await asyncio.sleep(0)
+    loader.gate.set()
+    await asyncio.gather(*lookups)
+
+    assert loader.calls == 1
+    assert index.is_booked("2026-01-19", "09:00:00")
+
+
+async def test_stale_index_serves_old_snapshot_while_refreshing() -> None:
+    loader = Loader([_row("2026-01-19", "09:00:00")])
+    index = SlotAvailabilityIndex(loader, ttl=0)
+    await index.ensure_fresh()
+
+    loader.rows = []
+    loader.gate = asyncio.Event()
+    await index.ensure_fresh()
+    await _settle()
+
+    # Didn't wait for the refresh
+    assert loader.calls == 2
+    assert index.is_booked("2026-01-19", "09:00:00")
+
+    loader.gate.set()
+    await _settle()
+    assert not index.is_booked("2026-01-19", "09:00:00")
+
+
+def test_call_slot_hold_replaces_and_expires() -> None:
+    hold = CallSlotHold(ttl=60)
+
+    hold.grant("2026-01-19", "09:00:00", hold_id="1")
+    hold.grant("2026-01-19", "10:00:00", hold_id="2")
+    assert not hold.holds("2026-01-19", "09:00:00")
+    assert hold.holds("2026-01-19", "10:00:00")
+
+    hold.ttl = 0
+    hold.grant("2026-01-19", "11:00:00", hold_id="3")
+    assert hold.lease is None
@@ -0,0 +1,126 @@
+import asyncio
+
+from livekit.agents import llm
+
+from context_window import SUMMARY_ITEM_ID, ContextWindow
+
+
+class FakeAgent:
+    """
+    The two Agent members ContextWindow uses.
+    """
+
+    def __init__(self):
+        self.chat_ctx = llm.ChatContext()
+        self.chat_ctx.add_message(role="system", content="instructions")
+
+    async def update_chat_ctx(self, chat_ctx: llm.ChatContext) -> None:
+        self.chat_ctx = chat_ctx
+
+
+class FakeSummarizer:
+    """
+    Records what it was asked to fold; holds each fold at `gate` if set.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.gate = None
+
+    async def __call__(self, summary: str, items: list) -> str:
+        self.calls.append((summary, items))
+        if self.gate is not None:
+            await self.gate.wait()
+        return f"summary {len(self.calls)}"
+
+
+def _turn(agent: FakeAgent, n: int) -> None:
+    agent.chat_ctx.add_message(role="user", content=f"user {n}")
+    agent.chat_ctx.items.append(
+        llm.FunctionCall(call_id=f"call {n}", name="fetch_slots", arguments="{}")
+    )
+    agent.chat_ctx.items.append(
+        llm.FunctionCallOutput(call_id=f"call {n}", name="fetch_slots", output="[]", is_error=False)
+    )
+    agent.chat_ctx.add_message(role="assistant", content=f"assistant {n}")
+
+
+def _texts(items: list) -> list[str]:
+    return [item.text_content if item.type == "message" else item.type for item in items]
+
+
+async def _fold(window: ContextWindow) -> None:
+    window.on_item_added()
+    await window._task
+
+
+async def test_folds_whole_turns_before_the_kept_ones() -> None:
+    agent, summarize = FakeAgent(), FakeSummarizer()
+    window = ContextWindow(agent, keep_turns=2, fold_turns=2, summarize=summarize)
+    for n in range(1, 5):
+        _turn(agent, n)
+
+    await _fold(window)
+
+    [(_, folded)] = summarize.calls
+    # Turns 1 and 2 with their tool calls; cut right before a user message
+    assert _texts(folded) == [
+        "user 1", "function_call", "function_call_output", "assistant 1",
+        "user 2", "function_call", "function_call_output", "assistant 2",
+    ]
+    assert _texts(agent.chat_ctx.items)[:4] == [
+        "instructions", "Summary of the call so far:\nsummary 1", "user 3", "function_call"
+    ]
+
+
+async def test_waits_for_enough_turns_to_fold() -> None:
+    agent, summarize = FakeAgent(), FakeSummarizer()
+    window = ContextWindow(agent, keep_turns=2, fold_turns=2, summarize=summarize)
+    for n in range(1, 4):
+        _turn(agent, n)
+
+    window.on_item_added()
+
+    assert window._task is None
+    assert summarize.calls == []
+
+
+async def test_keeps_items_added_while_folding() -> None:
+    agent, summarize = FakeAgent(), FakeSummarizer()
+    summarize.gate = asyncio.Event()
+    window = ContextWindow(agent, keep_turns=2, fold_turns=2, summarize=summarize)
+    for n in range(1, 5):
+        _turn(agent, n)
+
+    window.on_item_added()
+    await asyncio.sleep(0)
+    _turn(agent, 5)
+    summarize.gate.set()
+    await window._task
+
+    texts = _texts(agent.chat_ctx.items)
+    assert "user 1" not in texts
+    assert texts[-4:] == ["user 5", "function_call", "function_call_output", "assistant 5"]
+
+
+async def test_replaces_the_previous_summary() -> None:
+    agent, summarize = FakeAgent(), FakeSummarizer()
+    window = ContextWindow(agent, keep_turns=2, fold_turns=2, summarize=summarize)
+    for n in range(1, 5):
+        _turn(agent, n)
+    await _fold(window)
+
+    for n in range(5, 7):
+        _turn(agent, n)
+    await _fold(window)
+
+    # The earlier summary is passed in, not folded as a chat item
+    summary, folded = summarize.calls[1]
+    assert summary == "summary 1"
+    assert SUMMARY_ITEM_ID not in [item.id for item in folded]
+    assert _texts(folded)[0] == "user 3"
+
+    summaries = [item for item in agent.chat_ctx.items if item.id == SUMMARY_ITEM_ID]
+    assert len(summaries) == 1
+    assert summaries[0].text_content == "Summary of the call so far:\nsummary 2"
+    assert window.stats()["folds"] == 2
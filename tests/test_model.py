@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import postgrest
+import pytest
+
+import model
+
+
+@pytest.fixture
+def sent(monkeypatch) -> list:
+    """
+    Builds model's queries against a dummy PostgREST URL and collects
+    them instead of sending them.
+    """
+    queries = []
+
+    async def execute(query, timeout=None):
+        queries.append(query)
+        return SimpleNamespace(data=[])
+
+    client = postgrest.SyncPostgrestClient("http://db.test")
+    monkeypatch.setattr(model, "get_supabase", lambda: client)
+    monkeypatch.setattr(model, "_execute", execute)
+    return queries
+
+
+def _row(day: str, time: str) -> dict:
+    return {"id": f"{day} {time}", "date": day, "time": time, "status": "BOOKED"}
+
+
+async def test_page_after_cursor_quotes_keyset_values(sent) -> None:
+    await model.db_get_appointments_page(
+        "2026-01-19", "2026-02-18", after=("2026-01-20", "10:00:00"), limit=2
+    )
+
+    params = sent[0].request.params
+    # ":" is reserved inside or=(...), so the values must be quoted
+    assert params["or"] == (
+        '(date.gt."2026-01-20",'
+        'and(date.eq."2026-01-20",time.gt."10:00:00"))'
+    )
+    assert params.get_list("date") == ["gte.2026-01-19", "lte.2026-02-18"]
+    assert params["status"] == "eq.BOOKED"
+    assert params["order"] == "date.asc,time.asc"
+    assert params["limit"] == "2"
+
+
+async def test_get_all_appointments_pages_until_a_short_page(monkeypatch) -> None:
+    pages = [
+        [_row("2026-01-19", "09:00:00"), _row("2026-01-20", "10:00:00")],
+        [_row("2026-01-20", "11:00:00"), _row("2026-01-21", "09:00:00")],
+        [_row("2026-01-22", "09:00:00")],
+    ]
+    cursors = []
+
+    async def page(start_date, end_date=None, contact_number=None, after=None, limit=0):
+        cursors.append(after)
+        return pages.pop(0)
+
+    monkeypatch.setattr(model, "db_get_appointments_page", page)
+
+    rows = await model.db_get_all_appointments("2026-01-19", page_size=2)
+
+    assert [row["id"] for row in rows] == [
+        "2026-01-19 09:00:00",
+        "2026-01-20 10:00:00",
+        "2026-01-20 11:00:00",
+        "2026-01-21 09:00:00",
+        "2026-01-22 09:00:00",
+    ]
+    # Each page starts after the last row of the previous one
+    assert cursors == [
+        None,
+        ("2026-01-20", "10:00:00"),
+        ("2026-01-21", "09:00:00"),
+    ]
@@ -0,0 +1,8 @@
+from prompt import INSTRUCTIONS, build_instructions, estimate_tokens, token_report
+
+# What the rules make the agent do is evaluated in test_agent.py
+
+
+def test_instructions_are_compact_and_stable() -> None:
+    assert build_instructions() == INSTRUCTIONS
+    assert token_report()["total"] == estimate_tokens(INSTRUCTIONS) < 400
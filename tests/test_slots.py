@@ -0,0 +1,62 @@
+from datetime import date, datetime, time
+from itertools import islice
+
+from slots import SlotSchedule
+
+# A Monday
+MONDAY = date(2026, 1, 19)
+
+
+def test_day_times_skip_breaks() -> None:
+    schedule = SlotSchedule(
+        open_time=time(9, 0),
+        close_time=time(12, 0),
+        slot_minutes=60,
+        breaks=((time(10, 0), time(11, 0)),),
+    )
+
+    assert schedule.day_times == ("09:00:00", "11:00:00")
+
+
+def test_iter_available_excludes_booked_weekends_and_holidays() -> None:
+    schedule = SlotSchedule(
+        open_time=time(9, 0),
+        close_time=time(11, 0),
+        slot_minutes=60,
+        breaks=(),
+        holidays=frozenset({"2026-01-20"}),
+    )
+    booked = {"2026-01-19": {"09:00:00"}}
+
+    slots = list(schedule.iter_available(MONDAY, 6, booked))
+
+    assert [(s["date"], s["time"]) for s in slots] == [
+        ("2026-01-19", "10:00:00"),
+        ("2026-01-21", "09:00:00"),
+        ("2026-01-21", "10:00:00"),
+        ("2026-01-22", "09:00:00"),
+        ("2026-01-22", "10:00:00"),
+        ("2026-01-23", "09:00:00"),
+        ("2026-01-23", "10:00:00"),
+    ]
+
+
+def test_iter_available_skips_elapsed_slots_today() -> None:
+    schedule = SlotSchedule()
+    now = datetime(2026, 1, 19, 16, 10)
+
+    slots = list(islice(schedule.iter_available(MONDAY, 1, {}, not_before=now), 2))
+
+    assert [(s["date"], s["time"]) for s in slots] == [
+        ("2026-01-19", "16:30:00"),
+        ("2026-01-20", "09:00:00"),
+    ]
+
+
+def test_is_valid_slot() -> None:
+    schedule = SlotSchedule()
+
+    assert schedule.is_valid_slot("2026-01-19", "09:30:00")
+    assert not schedule.is_valid_slot("2026-01-19", "13:00:00")  # lunch break
+    assert not schedule.is_valid_slot("2026-01-24", "09:30:00")  # Saturday
+    assert not schedule.is_valid_slot("not-a-date", "09:30:00")
@@ -0,0 +1,131 @@
+import asyncio
+import json
+from dataclasses import asdict
+
+import pytest
+
+import summary
+from summary import SummaryJob, SummaryQueue
+
+
+class FakeBackend:
+    """
+    Stands in for the LLM and the DB: records what was summarized and
+    saved, and fails the first `save_failures` saves.
+    """
+
+    def __init__(self, save_failures: int = 0):
+        self.single = []
+        self.batches = []
+        self.saved = {}
+        self.save_failures = save_failures
+
+    async def generate_call_summary(self, job) -> str:
+        self.single.append(job.session_id)
+        return f"summary of {job.session_id}"
+
+    async def generate_call_summaries(self, jobs) -> dict[str, str]:
+        self.batches.append([job.session_id for job in jobs])
+        # The model may skip a call; that one falls back to its own request
+        return {job.session_id: f"batched {job.session_id}" for job in jobs[1:]}
+
+    async def save_call_summary(self, session_id, contact_number, summary) -> None:
+        if self.save_failures:
+            self.save_failures -= 1
+            raise ConnectionError("db down")
+        self.saved[session_id] = summary
+
+
+@pytest.fixture
+def backend(monkeypatch) -> FakeBackend:
+    fake = FakeBackend()
+    monkeypatch.setattr(summary, "generate_call_summary", fake.generate_call_summary)
+    monkeypatch.setattr(summary, "generate_call_summaries", fake.generate_call_summaries)
+    monkeypatch.setattr(summary, "save_call_summary", fake.save_call_summary)
+
+    # Retry backoff without the wait
+    sleep = asyncio.sleep
+    monkeypatch.setattr(summary.asyncio, "sleep", lambda seconds: sleep(0))
+    return fake
+
+
+def _job(session_id: str) -> SummaryJob:
+    return SummaryJob(
+        session_id=session_id,
+        contact_number="5551234567",
+        transcripts=[{"role": "user", "content": "Hi"}]
+    )
+
+
+async def test_saves_summary_and_clears_spool(backend, tmp_path) -> None:
+    queue = SummaryQueue(spool_dir=tmp_path)
+    published = []
+
+    async def on_summary(text: str) -> None:
+        published.append(text)
+
+    queue.enqueue(_job("call-1"), on_summary=on_summary)
+    # Spooled before any work starts
+    assert len(list(tmp_path.glob("call-1.*.json"))) == 1
+
+    assert await queue.drain(timeout=1)
+
+    assert backend.saved == {"call-1": "summary of call-1"}
+    assert published == ["summary of call-1"]
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_failed_save_is_retried_without_regenerating(backend, tmp_path) -> None:
+    backend.save_failures = 2
+    queue = SummaryQueue(spool_dir=tmp_path)
+
+    queue.enqueue(_job("call-1"))
+    assert await queue.drain(timeout=1)
+
+    assert backend.saved == {"call-1": "summary of call-1"}
+    assert backend.single == ["call-1"]
+
+
+async def test_gives_up_after_max_attempts_and_keeps_spool(backend, tmp_path) -> None:
+    backend.save_failures = 5
+    queue = SummaryQueue(spool_dir=tmp_path, max_attempts=2)
+
+    queue.enqueue(_job("call-1"))
+    assert await queue.drain(timeout=1)
+
+    assert backend.saved == {}
+    [path] = tmp_path.glob("call-1.*.json")
+    # The summary is kept, so a replay only has to save it
+    assert json.loads(path.read_text())["summary"] == "summary of call-1"
+
+
+async def test_replays_spool_left_by_exited_process(backend, tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(summary, "_pid_alive", lambda pid: False)
+    job = _job("call-1")
+    job.summary = "summary from before"
+    (tmp_path / "call-1.12345.json").write_text(json.dumps(asdict(job)))
+
+    queue = SummaryQueue(spool_dir=tmp_path)
+    assert queue.replay_spool() == 1
+    assert await queue.drain(timeout=1)
+
+    assert backend.saved == {"call-1": "summary from before"}
+    assert backend.single == []
+    assert list(tmp_path.iterdir()) == []
+
+
+async def test_batches_jobs_already_queued(backend, tmp_path) -> None:
+    queue = SummaryQueue(spool_dir=tmp_path, concurrency=1)
+
+    for session_id in ("call-1", "call-2", "call-3"):
+        queue.enqueue(_job(session_id))
+    assert await queue.drain(timeout=1)
+
+    assert backend.batches == [["call-1", "call-2", "call-3"]]
+    # Skipped by the batch, so summarized on its own
+    assert backend.single == ["call-1"]
+    assert backend.saved == {
+        "call-1": "summary of call-1",
+        "call-2": "batched call-2",
+        "call-3": "batched call-3",
+    }
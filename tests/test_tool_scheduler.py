@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from tool_scheduler import ToolScheduler
+
+
+async def _run(scheduler: ToolScheduler, mode: str, name: str, log: list, hold: asyncio.Event) -> None:
+    async with scheduler.access(mode):
+        log.append(f"start {name}")
+        await hold.wait()
+        log.append(f"end {name}")
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_reads_overlap() -> None:
+    scheduler = ToolScheduler()
+    log: list[str] = []
+    hold = asyncio.Event()
+
+    tasks = [
+        asyncio.create_task(_run(scheduler, "read", name, log, hold))
+        for name in ("a", "b")
+    ]
+    await _settle()
+
+    # Both started before either finished
+    assert log == ["start a", "start b"]
+
+    hold.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_writes_run_alone_in_call_order() -> None:
+    scheduler = ToolScheduler()
+    log: list[str] = []
+    hold = asyncio.Event()
+
+    tasks = [
+        asyncio.create_task(_run(scheduler, mode, name, log, hold))
+        for mode, name in (("read", "r1"), ("write", "w1"), ("write", "w2"), ("read", "r2"))
+    ]
+    await _settle()
+    # The write waits for the read issued before it; everything after waits too
+    assert log == ["start r1"]
+
+    hold.set()
+    await asyncio.gather(*tasks)
+
+    assert log == [
+        "start r1", "end r1",
+        "start w1", "end w1",
+        "start w2", "end w2",
+        "start r2", "end r2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_while_waiting_does_not_block_the_queue() -> None:
+    scheduler = ToolScheduler()
+    log: list[str] = []
+    hold = asyncio.Event()
+
+    first = asyncio.create_task(_run(scheduler, "write", "w1", log, hold))
+    waiting = asyncio.create_task(_run(scheduler, "write", "w2", log, hold))
+    last = asyncio.create_task(_run(scheduler, "read", "r1", log, hold))
+    await _settle()
+
+    waiting.cancel()
+    await _settle()
+    assert waiting.cancelled()
+
+    hold.set()
+    await asyncio.gather(first, last)
+
+    assert log == ["start w1", "end w1", "start r1", "end r1"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_while_holding_releases_the_slot() -> None:
+    scheduler = ToolScheduler()
+    log: list[str] = []
+    never = asyncio.Event()
+    hold = asyncio.Event()
+
+    holding = asyncio.create_task(_run(scheduler, "write", "w1", log, never))
+    waiting = asyncio.create_task(_run(scheduler, "write", "w2", log, hold))
+    await _settle()
+    assert log == ["start w1"]
+
+    holding.cancel()
+    await _settle()
+    assert holding.cancelled()
+    assert log == ["start w1", "start w2"]
+
+    hold.set()
+    await waiting
+    assert log == ["start w1", "start w2", "end w2"]